@@ -0,0 +1,99 @@
+#-------------------------------------------------------------
+# Micro-benchmark for the get_file_hash I/O backends.
+#-------------------------------------------------------------
+
+import os
+import time
+import pathlib
+import tempfile
+import argparse
+
+from find_duplicate_files import get_file_hash
+from sparkwarden_lib import LF
+
+
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+# (label, chunksize, io_backend); the first entry is the original path
+BENCH_CASE_LIST = [
+	('read 4096', 4096, 'read'),
+	('read adaptive', 0, 'read'),
+	('readinto adaptive', 0, 'readinto'),
+	('mmap', 0, 'mmap'),
+]
+
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def make_bench_files(bench_dir, file_size_list):
+	"""
+	Write one file of random bytes per size in [file_size_list].
+	"""
+	file_path_list = []
+	for filesize in file_size_list:
+		file_path = str(pathlib.Path(bench_dir).joinpath(f'bench_{filesize}.bin'))
+		with open(file_path, 'wb') as f:
+			remaining = filesize
+			while remaining > 0:
+				block = os.urandom(min(remaining, 1024 * 1024))
+				f.write(block)
+				remaining -= len(block)
+		file_path_list.append(file_path)
+	return file_path_list
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def time_hash(file_path, chunksize, io_backend, algo, repeat):
+	"""
+	Return the best wall time of [repeat] hashes of [file_path].
+	"""
+	best_time = None
+	for _ in range(repeat):
+		start_time = time.perf_counter()
+		get_file_hash(file_path, chunksize, io_backend, algo)
+		elapsed = time.perf_counter() - start_time
+		if best_time is None or elapsed < best_time:
+			best_time = elapsed
+	return best_time
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def main():
+	parser = argparse.ArgumentParser(description='get_file_hash I/O backend benchmark')
+	parser.add_argument('-Sizes', default='4096,1048576,67108864',\
+		help='comma separated file sizes in bytes')
+	parser.add_argument('-Repeat', default=5, type=int)
+	parser.add_argument('-Dir', default=None, help='directory for the bench files')
+	parser.add_argument('-HashAlgo', default='md5')
+	args = parser.parse_args()
+	
+	file_size_list = [int(size) for size in args.Sizes.split(',')]
+	
+	with tempfile.TemporaryDirectory(dir=args.Dir) as bench_dir:
+		file_path_list = make_bench_files(bench_dir, file_size_list)
+		
+		for filesize, file_path in zip(file_size_list, file_path_list):
+			print(f'{LF}file size: {filesize} bytes')
+			digest_set = set()
+			base_time = None
+			for label, chunksize, io_backend in BENCH_CASE_LIST:
+				digest_set.add(get_file_hash(file_path, chunksize, io_backend, args.HashAlgo))
+				elapsed = time_hash(file_path, chunksize, io_backend, args.HashAlgo, args.Repeat)
+				if base_time is None:
+					base_time = elapsed
+				mb_per_sec = filesize / elapsed / 1e6 if elapsed > 0 else 0.0
+				print(f' {label:<20} {elapsed * 1e3:10.3f} ms {mb_per_sec:10.1f} MB/s'\
+					f' {base_time / elapsed if elapsed > 0 else 0.0:6.2f}x')
+			if len(digest_set) != 1:
+				print(' WARNING: backends disagree on the digest')
+				
+	
+if __name__ == "__main__":
+	main()
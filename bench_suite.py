@@ -0,0 +1,336 @@
+#-------------------------------------------------------------
+# Benchmark suite for the scan, hash and duplicate search stages,
+# run on a synthetic directory tree.
+#-------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import random
+import pathlib
+import platform
+import tempfile
+import argparse
+import datetime
+import subprocess
+import multiprocessing
+
+try:
+	import resource
+except ImportError:
+	resource = None	# not available on Windows; peak RSS is reported as 0
+	
+from find_duplicate_files import get_file_hash
+from find_duplicate_files import find_duplicate_files
+from find_duplicate_files import find_duplicate_files_pipelined
+from sparkwarden_lib import build_file_list
+from sparkwarden_lib import walk_files
+from sparkwarden_lib import clsFileNode
+from sparkwarden_lib import clsFileNodeLite
+from sparkwarden_lib import FileTable
+from sparkwarden_lib import LF
+
+
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+# (size in bytes, weight); a mix of small text-like files and a few big ones
+SIZE_DIST_DEFAULT = '512:40,4096:30,65536:20,1048576:9,16777216:1'
+
+def parse_size_dist(size_dist_str) -> list:
+	"""
+	Parse 'size:weight,size:weight,...' into [(size, weight)].
+	"""
+	size_dist = []
+	for item in size_dist_str.split(','):
+		size, _, weight = item.partition(':')
+		size_dist.append((int(size), float(weight or 1)))
+	return size_dist
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def make_synthetic_tree(root, file_count=1000, size_dist=None, dup_ratio=0.2,\
+	hardlink_ratio=0.05, depth=3, fanout=4, seed=0) -> dict:
+	"""
+	Write a reproducible tree of [file_count] files below [root].
+	
+	Directories are [fanout] wide and [depth] deep, and files are
+	spread over all of them. File sizes are drawn from [size_dist],
+	a list of (size, weight); each size is jittered by up to 1/8 so
+	most files do not share a size by accident. [dup_ratio] of the
+	files are copies of an earlier file and [hardlink_ratio] are
+	hardlinks to one. The same [seed] always gives the same tree.
+	
+	returns:
+		dict describing the tree, stored with the results.
+	"""
+	rng = random.Random(seed)
+	if size_dist is None:
+		size_dist = parse_size_dist(SIZE_DIST_DEFAULT)
+	sizes, weights = zip(*size_dist)
+	
+	dir_list = [str(root)]
+	level_dirs = [str(root)]
+	for _ in range(depth):
+		next_dirs = []
+		for parent in level_dirs:
+			for n in range(fanout):
+				next_dirs.append(os.path.join(parent, f'd{n}'))
+		dir_list.extend(next_dirs)
+		level_dirs = next_dirs
+	for dirpath in dir_list:
+		os.makedirs(dirpath, exist_ok=True)
+	
+	written_list = []
+	tree_info = {'file_count': file_count, 'dir_count': len(dir_list), 'depth': depth,\
+		'fanout': fanout, 'seed': seed, 'size_dist': size_dist, 'dup_ratio': dup_ratio,\
+		'hardlink_ratio': hardlink_ratio, 'total_bytes': 0, 'dup_count': 0, 'hardlink_count': 0}
+	for n in range(file_count):
+		file_path = os.path.join(rng.choice(dir_list), f'f{n}.bin')
+		kind = rng.random()
+		if written_list and kind < hardlink_ratio:
+			source_path = rng.choice(written_list)
+			try:
+				os.link(source_path, file_path)
+				tree_info['hardlink_count'] += 1
+				tree_info['total_bytes'] += os.path.getsize(file_path)
+				continue
+			except OSError:
+				pass	# no hardlinks on this file system; write a copy
+		if written_list and kind < hardlink_ratio + dup_ratio:
+			with open(rng.choice(written_list), 'rb') as f:
+				data = f.read()
+			tree_info['dup_count'] += 1
+		else:
+			filesize = rng.choices(sizes, weights)[0]
+			filesize += rng.randrange(max(1, filesize // 8))
+			data = rng.randbytes(filesize)
+		with open(file_path, 'wb') as f:
+			f.write(data)
+		tree_info['total_bytes'] += len(data)
+		written_list.append(file_path)
+	
+	return tree_info
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+# Each scenario takes the tree root and returns (files, bytes)
+# processed, for the files/s and MB/s figures. For the find
+# scenarios bytes is the size of the scanned tree, not bytes read.
+
+def bench_build_file_list(root, jobs):
+	file_list = build_file_list(root, '*')
+	return len(file_list), 0
+	
+def bench_walk_files(root, jobs):
+	file_cnt = 0
+	for _ in walk_files(root):
+		file_cnt += 1
+	return file_cnt, 0
+	
+def bench_filetable(root, jobs):
+	file_table = FileTable.from_walk(root)
+	return len(file_table), 0
+	
+def bench_clsfilenode(root, jobs):
+	with clsFileNode.scoped_index() as index:
+		for path in build_file_list(root, '*'):
+			clsFileNode(path)
+		return len(index), 0
+	
+def bench_clsfilenodelite(root, jobs):
+	file_cnt = 0
+	for path, _stat in walk_files(root):
+		clsFileNodeLite.from_stat(path, _stat).filesize
+		file_cnt += 1
+	return file_cnt, 0
+	
+def bench_get_file_hash(root, jobs):
+	file_cnt = 0
+	byte_cnt = 0
+	for path, _stat in walk_files(root):
+		get_file_hash(path)
+		file_cnt += 1
+		byte_cnt += _stat.st_size
+	return file_cnt, byte_cnt
+	
+def bench_find_full(root, jobs):
+	file_table = FileTable.from_walk(root)
+	find_duplicate_files(file_table, jobs=jobs)
+	return len(file_table), file_table.total_size()
+	
+def bench_find_staged(root, jobs):
+	file_table = FileTable.from_walk(root)
+	find_duplicate_files(file_table, samplesize=4096, jobs=jobs)
+	return len(file_table), file_table.total_size()
+	
+def bench_find_pipelined(root, jobs):
+	file_table, _ = find_duplicate_files_pipelined([root], samplesize=4096, jobs=jobs)
+	return len(file_table), file_table.total_size()
+	
+SCENARIO_DICT = {
+	'walk.build_file_list': bench_build_file_list,
+	'walk.walk_files': bench_walk_files,
+	'walk.filetable': bench_filetable,
+	'node.clsFileNode': bench_clsfilenode,
+	'node.clsFileNodeLite': bench_clsfilenodelite,
+	'hash.get_file_hash': bench_get_file_hash,
+	'find.full': bench_find_full,
+	'find.staged': bench_find_staged,
+	'find.pipelined': bench_find_pipelined,
+}
+
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_peak_rss_kb() -> int:
+	if resource is None:
+		return 0
+	peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == 'darwin':
+		peak_rss //= 1024	# bytes on macOS, KiB elsewhere
+	return peak_rss
+	
+def run_scenario_child(name, root, jobs, result_queue):
+	start_rss = get_peak_rss_kb()
+	start_time = time.perf_counter()
+	file_cnt, byte_cnt = SCENARIO_DICT[name](root, jobs)
+	elapsed = time.perf_counter() - start_time
+	result_queue.put((elapsed, file_cnt, byte_cnt, get_peak_rss_kb(), start_rss))
+	
+def run_scenario(name, root, jobs=1, repeat=3) -> dict:
+	"""
+	Run scenario [name] [repeat] times, each in a fresh process so
+	peak RSS belongs to that scenario alone, and keep the best time.
+	"""
+	ctx = multiprocessing.get_context('spawn')
+	best = None
+	for _ in range(repeat):
+		result_queue = ctx.Queue()
+		proc = ctx.Process(target=run_scenario_child, args=(name, root, jobs, result_queue))
+		proc.start()
+		run_result = result_queue.get()
+		proc.join()
+		if best is None or run_result[0] < best[0]:
+			best = run_result
+	
+	elapsed, file_cnt, byte_cnt, peak_rss_kb, base_rss_kb = best
+	return {
+		'scenario': name,
+		'jobs': jobs,
+		'seconds': elapsed,
+		'files': file_cnt,
+		'bytes': byte_cnt,
+		'files_per_sec': file_cnt / elapsed if elapsed > 0 else 0.0,
+		'mb_per_sec': byte_cnt / elapsed / 1e6 if elapsed > 0 else 0.0,
+		'peak_rss_kb': peak_rss_kb,
+		'base_rss_kb': base_rss_kb,
+	}
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_git_commit() -> str:
+	try:
+		return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],\
+			cwd=os.path.dirname(os.path.abspath(__file__)),\
+			capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return ''
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def print_results(result_list, base_result_dict=None):
+	print(f'{LF}{"scenario":<24} {"seconds":>9} {"files/s":>11} {"MB/s":>9} {"peak RSS MB":>12} {"+run MB":>8}', end='')
+	print(f' {"vs base":>8}' if base_result_dict else '')
+	for result in result_list:
+		print(f'{result["scenario"]:<24} {result["seconds"]:9.3f} {result["files_per_sec"]:11.0f}'\
+			f' {result["mb_per_sec"]:9.1f} {result["peak_rss_kb"] / 1024:12.1f}'\
+			f' {(result["peak_rss_kb"] - result["base_rss_kb"]) / 1024:8.1f}', end='')
+		base_result = (base_result_dict or {}).get(result['scenario'])
+		if base_result is not None and result['seconds'] > 0:
+			print(f' {base_result["seconds"] / result["seconds"]:7.2f}x')
+		else:
+			print()
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def main():
+	parser = argparse.ArgumentParser(description='scan, hash and duplicate search benchmark')
+	parser.add_argument('-FileCount', default=2000, type=int)
+	parser.add_argument('-SizeDist', default=SIZE_DIST_DEFAULT,\
+		help='comma separated size:weight pairs, sizes in bytes')
+	parser.add_argument('-DupRatio', default=0.2, type=float)
+	parser.add_argument('-HardlinkRatio', default=0.05, type=float)
+	parser.add_argument('-Depth', default=3, type=int)
+	parser.add_argument('-Fanout', default=4, type=int)
+	parser.add_argument('-Seed', default=0, type=int)
+	parser.add_argument('-Jobs', default=1, type=int)
+	parser.add_argument('-Repeat', default=3, type=int)
+	parser.add_argument('-Scenarios', default='all',\
+		help='comma separated scenario names or prefixes, e.g. walk,find.staged')
+	parser.add_argument('-Dir', default=None, help='directory for the synthetic tree')
+	parser.add_argument('-Output', default='', help='results json path')
+	parser.add_argument('-Compare', default='', help='earlier results json to compare with')
+	args = parser.parse_args()
+	
+	if args.Scenarios == 'all':
+		scenario_list = list(SCENARIO_DICT)
+	else:
+		prefix_list = args.Scenarios.split(',')
+		scenario_list = [name for name in SCENARIO_DICT\
+			if any(name == prefix or name.startswith(prefix + '.') for prefix in prefix_list)]
+	
+	commit = get_git_commit()
+	with tempfile.TemporaryDirectory(dir=args.Dir) as bench_dir:
+		print(f'{LF}building synthetic tree in {bench_dir}. . .')
+		tree_info = make_synthetic_tree(bench_dir, args.FileCount, parse_size_dist(args.SizeDist),\
+			args.DupRatio, args.HardlinkRatio, args.Depth, args.Fanout, args.Seed)
+		print(f'{tree_info["file_count"]} files, {tree_info["dir_count"]} dirs, '\
+			f'{tree_info["total_bytes"] / 1e6:.1f} MB, {tree_info["dup_count"]} copies, '\
+			f'{tree_info["hardlink_count"]} hardlinks')
+		
+		result_list = []
+		for name in scenario_list:
+			print(f'{LF}running {name}. . .', end='', flush=True)
+			result_list.append(run_scenario(name, bench_dir, args.Jobs, args.Repeat))
+	
+	base_result_dict = None
+	if args.Compare:
+		with open(args.Compare, 'r', encoding='utf-8') as f:
+			base_result_dict = {result['scenario']: result for result in json.load(f)['results']}
+	print()
+	print_results(result_list, base_result_dict)
+	
+	output_path = args.Output
+	if not output_path:
+		timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+		output_path = f'{pathlib.Path(__file__).stem}_{commit or "nocommit"}_{timestamp}.json'
+	bench_record = {
+		'commit': commit,
+		'timestamp': datetime.datetime.now().isoformat(),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'cpu_count': os.cpu_count(),
+		'args': vars(args),
+		'tree': tree_info,
+		'results': result_list,
+	}
+	with open(output_path, 'w', encoding='utf-8') as f:
+		json.dump(bench_record, f, indent=1)
+	print(f'{LF}results written to {output_path}')
+
+	
+if __name__ == "__main__":
+	main()
@@ -4,15 +4,44 @@
 
 import hashlib
 import pathlib
-import filecmp
 import argparse
+import functools
+import concurrent.futures
+import os
+import sys
+import time
+import sqlite3
+import mmap
+import threading
+import queue
+import random
+import bisect
+import traceback
+import errno
 
+try:
+	import numpy
+except ImportError:
+	numpy = None	# optional, vectorizes the chunking rolling hash
+	
+try:
+	import resource
+except ImportError:
+	resource = None	# not available on Windows; the verify batch stays at its cap
+	
 from sparkwarden_lib import Message_Writer
 from sparkwarden_lib import select_from_list
-from sparkwarden_lib import build_file_list
+from sparkwarden_lib import walk_files
+from sparkwarden_lib import get_nested_roots
 from sparkwarden_lib import ProgressBar
-from sparkwarden_lib import clsFileNode
+from sparkwarden_lib import FileTable
+from sparkwarden_lib import Dir_Snapshot
+from sparkwarden_lib import Report_Writer
 from sparkwarden_lib import MY_Timer
+from sparkwarden_lib import timer_span
+from sparkwarden_lib import get_text_file_minhash
+from sparkwarden_lib import MinHash_Index
+from sparkwarden_lib import TEXT_SNIFF_SIZE
 from sparkwarden_lib import LF
 
 
@@ -24,21 +53,19 @@ class Parse_Arg:
 	node_list = []
 	arg_parsed_dict = {}
 	
-	def __init__(self, name, default_value, is_required=False, help_text=''):
+	def __init__(self, name, default_value, is_required=False, help_text='', arg_type=None, nargs=None):
 		self.name = name
 		self.default_value = default_value
 		self.is_required = is_required
-		self.help_text = ''
+		self.help_text = help_text
+		self.arg_type = arg_type
+		self.nargs = nargs
 		
 		Parse_Arg.node_list_add(self)
 	
 	@classmethod
 	def get_arg_by_name(cls, name:str):
 		ret_arg = None
-		print()
-		print('cls.arg_parsed_dict')
-		print(cls.arg_parsed_dict)
-		print()
 		
 		for k,v in cls.arg_parsed_dict.items():
 			if k == name:
@@ -78,8 +105,13 @@ class Parse_Arg:
 		parser = argparse.ArgumentParser(description=cls.description)
 	
 		for nd in cls.node_list:
+			_kwargs = {}
+			if nd.arg_type is not None:
+				_kwargs['type'] = nd.arg_type
+			if nd.nargs is not None:
+				_kwargs['nargs'] = nd.nargs
 			parser.add_argument(nd.name, required=nd.is_required, \
-				default=nd.default_value, help=nd.help_text)
+				default=nd.default_value, help=nd.help_text, **_kwargs)
 		
 		results = parser.parse_args()
 		cls.arg_parsed_dict = results.__dict__
@@ -89,6 +121,27 @@ class Parse_Arg:
 # 
 #-------------------------------------------------------------
 
+def get_user_cache_dir() -> str:
+	"""
+	Per-user directory for the 'auto' hash cache and dir snapshot:
+	LOCALAPPDATA on Windows, ~/Library/Caches on macOS and
+	XDG_CACHE_HOME or ~/.cache elsewhere, in a subdirectory named
+	after this program. It is created when missing.
+	"""
+	if sys.platform == 'win32':
+		base_dir = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+	elif sys.platform == 'darwin':
+		base_dir = os.path.expanduser(os.path.join('~', 'Library', 'Caches'))
+	else:
+		base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache'))
+	cache_dir = os.path.join(base_dir, pathlib.Path(__file__).stem)
+	os.makedirs(cache_dir, exist_ok=True)
+	return cache_dir
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
 def select_dir(start_dir=pathlib.Path().cwd()) -> str:
 	
 	resdir = start_dir
@@ -132,138 +185,1744 @@ def select_dir(start_dir=pathlib.Path().cwd()) -> str:
 # 
 #-------------------------------------------------------------
 
-def get_file_hash(file_path, chunksize):
-	hash_md5 = hashlib.md5()
+HASH_ALGO_PROBE_LIST = ['md5', 'sha1', 'sha256', 'sha512', 'blake2b', 'blake2s']
+HASH_ALGO_PROBE_SIZE = 8 * 1024 * 1024
+
+def get_hash_object(algo='md5'):
+	"""
+	Return a new hashlib object for [algo].
+	
+	[algo] is any hashlib algorithm name. blake2b and blake2s also
+	accept a digest size in bytes as a suffix, e.g. 'blake2b-16'.
+	"""
+	name, _, digest_size = algo.partition('-')
+	if digest_size and name == 'blake2b':
+		return hashlib.blake2b(digest_size=int(digest_size))
+	if digest_size and name == 'blake2s':
+		return hashlib.blake2s(digest_size=int(digest_size))
+	return hashlib.new(algo)
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_hexdigest(file_hash) -> str:
+	# shake_* hashes have a variable length digest
+	if file_hash.digest_size == 0:
+		return file_hash.hexdigest(32)
+	return file_hash.hexdigest()
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def probe_hash_algos(algo_list=HASH_ALGO_PROBE_LIST, probe_size=HASH_ALGO_PROBE_SIZE,\
+	repeat=3) -> list:
+	"""
+	Time each of [algo_list] on an in-memory buffer.
+	
+	returns:
+		list of (algo, MB/s) tuples, fastest first.
+	"""
+	probe_buf = bytes(range(256)) * (probe_size // 256)
+	probe_list = []
+	for algo in algo_list:
+		best_time = None
+		for _ in range(repeat):
+			start_time = time.perf_counter()
+			get_hash_object(algo).update(probe_buf)
+			elapsed = time.perf_counter() - start_time
+			if best_time is None or elapsed < best_time:
+				best_time = elapsed
+		probe_list.append((algo, len(probe_buf) / max(best_time, 1e-9) / 1e6))
+	probe_list.sort(key=lambda probe: probe[1], reverse=True)
+	return probe_list
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+MIN_CHUNKSIZE = 64 * 1024
+MAX_CHUNKSIZE = 4 * 1024 * 1024
+
+_read_buffer = threading.local()
+
+def get_adaptive_chunksize(filesize) -> int:
+	"""
+	Return a read size of about 1/16 of [filesize], rounded up to a
+	power of two and clamped to [MIN_CHUNKSIZE, MAX_CHUNKSIZE].
+	"""
+	chunksize = MIN_CHUNKSIZE
+	while chunksize < MAX_CHUNKSIZE and chunksize * 16 < filesize:
+		chunksize *= 2
+	return chunksize
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_file_hash(file_path, chunksize=0, io_backend='readinto', algo='md5'):
+	"""
+	Return the [algo] hex digest of a file.
+	
+	parameters:
+		file_path - path of the file to hash.
+		chunksize - int, read size. 0 adapts it to the file size.
+		io_backend - 'read': a new bytes object per chunk.
+			'readinto': a reused per-thread bytearray.
+			'mmap': the whole file mapped and hashed in one call.
+		algo - hash algorithm name, see get_hash_object.
+	"""
+	file_hash = get_hash_object(algo)
 	with open(file_path, "rb") as f:
-		for chunk in iter(lambda: f.read(chunksize), b""): 
-			hash_md5.update(chunk)
-	return hash_md5.hexdigest()
+		filesize = os.fstat(f.fileno()).st_size
+		if chunksize <= 0:
+			chunksize = get_adaptive_chunksize(filesize)
+			
+		if io_backend == 'mmap':
+			if filesize > 0:
+				with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+					file_hash.update(mm)
+		elif io_backend == 'readinto':
+			buf = getattr(_read_buffer, 'buf', None)
+			if buf is None or len(buf) < chunksize:
+				buf = bytearray(chunksize)
+				_read_buffer.buf = buf
+			view = memoryview(buf)[:chunksize]
+			for size in iter(lambda: f.readinto(view), 0):
+				file_hash.update(view[:size])
+			view.release()
+		else:
+			for chunk in iter(lambda: f.read(chunksize), b""): 
+				file_hash.update(chunk)
+	return get_hexdigest(file_hash)
 	
 #-------------------------------------------------------------
 # 
 #-------------------------------------------------------------
 
-def find_duplicate_files(selected_files, chunksize=4096):
-	file_hash_dict = {}
-	duplicate_files = []
+def get_file_sample_hash(file_path, samplesize, algo='md5'):
+	"""
+	Hash the first and last [samplesize] bytes of a file.
+	Files no larger than 2 * [samplesize] are hashed in full.
+	"""
+	file_hash = get_hash_object(algo)
+	with open(file_path, "rb") as f:
+		head = f.read(samplesize)
+		file_hash.update(head)
+		if len(head) == samplesize:
+			f.seek(0, 2)
+			filesize = f.tell()
+			f.seek(max(samplesize, filesize - samplesize))
+			file_hash.update(f.read(samplesize))
+	return get_hexdigest(file_hash)
 	
-	progress = ProgressBar(len(selected_files), fmt=ProgressBar.FULL)
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+class Hash_Cache:
+	"""
+	Persistent file hash cache in a SQLite database.
 	
-	for path in selected_files:
+	Entries are keyed by (device, inode, size, mtime_ns) plus the
+	hash kind, so any change to a file's stat metadata is a miss.
+	"""
+	
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def __init__(self, db_path, max_entries=5000000):
+		self.db_path = db_path
+		self.max_entries = max_entries
+		self.hit_cnt = 0
+		self.miss_cnt = 0
+		self.pruned_cnt = 0
+		self.evicted_cnt = 0
+		self.run_time = time.time()
+		
+		self.conn = sqlite3.connect(db_path)
+		self.conn.execute('PRAGMA journal_mode=WAL')
+		self.conn.execute('PRAGMA synchronous=NORMAL')
+		self.conn.execute('CREATE TABLE IF NOT EXISTS file_hash ('\
+			'dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, '\
+			'kind TEXT, path TEXT, digest TEXT, used REAL, '\
+			'PRIMARY KEY (dev, ino, size, mtime_ns, kind))')
+		self.conn.execute('CREATE INDEX IF NOT EXISTS file_hash_used ON file_hash (used)')
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	@staticmethod
+	def get_stat_key(path) -> tuple:
+		_stat = os.stat(path)
+		return (_stat.st_dev, _stat.st_ino, _stat.st_size, _stat.st_mtime_ns)
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def get_hashes(self, file_paths, kind) -> tuple:
+		"""
+		Look up cached digests for [file_paths].
+		
+		returns:
+			file_hashes - list, digest or None (miss) per path.
+			stat_keys - list, stat key per path, for put_hashes.
+		"""
+		file_hashes = []
+		stat_keys = []
+		used_rows = []
+		for path in file_paths:
+			try:
+				stat_key = Hash_Cache.get_stat_key(path)
+			except OSError:
+				self.miss_cnt += 1
+				file_hashes.append(None)
+				stat_keys.append(None)
+				continue
+			row = self.conn.execute('SELECT digest FROM file_hash WHERE '\
+				'dev=? AND ino=? AND size=? AND mtime_ns=? AND kind=?',\
+				(*stat_key, kind)).fetchone()
+			if row is None:
+				self.miss_cnt += 1
+				file_hashes.append(None)
+			else:
+				self.hit_cnt += 1
+				file_hashes.append(row[0])
+				used_rows.append((self.run_time, path, *stat_key, kind))
+			stat_keys.append(stat_key)
+			
+		self.conn.executemany('UPDATE file_hash SET used=?, path=? WHERE '\
+			'dev=? AND ino=? AND size=? AND mtime_ns=? AND kind=?', used_rows)
+		self.conn.commit()
+		
+		return file_hashes, stat_keys
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def put_hashes(self, file_paths, stat_keys, file_hashes, kind):
+		rows = []
+		for path, stat_key, file_hash in zip(file_paths, stat_keys, file_hashes):
+			if stat_key is None or file_hash is None:
+				continue
+			rows.append((*stat_key, kind, path, file_hash, self.run_time))
+		self.conn.executemany('INSERT OR REPLACE INTO file_hash '\
+			'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+		self.conn.commit()
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def prune(self):
+		"""
+		Delete entries not used by this run whose path has vanished
+		or no longer matches the stored stat key.
+		"""
+		stale_rows = []
+		cursor = self.conn.execute('SELECT dev, ino, size, mtime_ns, path '\
+			'FROM file_hash WHERE used < ?', (self.run_time,))
+		for dev, ino, size, mtime_ns, path in cursor:
+			try:
+				is_stale = Hash_Cache.get_stat_key(path) != (dev, ino, size, mtime_ns)
+			except OSError:
+				is_stale = True
+			if is_stale:
+				stale_rows.append((dev, ino, size, mtime_ns))
+				
+		self.conn.executemany('DELETE FROM file_hash WHERE '\
+			'dev=? AND ino=? AND size=? AND mtime_ns=?', stale_rows)
+		self.conn.commit()
+		self.pruned_cnt += len(stale_rows)
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def evict(self):
+		"""
+		Delete the least recently used entries above [max_entries].
+		"""
+		entry_count = self.conn.execute('SELECT COUNT(*) FROM file_hash').fetchone()[0]
+		excess_count = entry_count - self.max_entries
+		if excess_count > 0:
+			self.conn.execute('DELETE FROM file_hash WHERE rowid IN '\
+				'(SELECT rowid FROM file_hash ORDER BY used LIMIT ?)', (excess_count,))
+			self.conn.commit()
+			self.evicted_cnt += excess_count
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def as_str(self) -> str:
+		_msg = f'{LF}<{self.__class__.__name__}> {self.db_path} '\
+			f'hits: {self.hit_cnt} misses: {self.miss_cnt} '\
+			f'pruned: {self.pruned_cnt} evicted: {self.evicted_cnt}'
+		return _msg
 		
-		progress()
+	def __repr__(self) -> str:
+		return self.as_str()
 		
-		file_path = path
-		file_hash = get_file_hash(path,chunksize)
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def close(self):
+		self.evict()
+		self.conn.close()
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
 
-		if file_hash in file_hash_dict:
-			duplicate_files.append((file_path, file_hash_dict[file_hash]))
+def group_files_by_size(selected_files, file_size_dict):
+	"""
+	Bucket files by size. A file with a unique size cannot have
+	a duplicate, so only buckets with two or more members are kept.
+	
+	parameters:
+		selected_files - list of file paths.
+		file_size_dict - dict, file path -> file size in bytes.
+		
+	returns:
+		size_groups - dict, file size -> list of file paths.
+		skipped_bytes - int, bytes in unique-size files (never read).
+	"""
+	size_dict = {}
+	for path in selected_files:
+		size_dict.setdefault(file_size_dict[path], []).append(path)
+		
+	size_groups = {}
+	skipped_bytes = 0
+	for filesize, paths in size_dict.items():
+		if len(paths) > 1:
+			size_groups[filesize] = paths
 		else:
-			file_hash_dict[file_hash] = file_path
-				
+			skipped_bytes += filesize
+			
+	return size_groups, skipped_bytes
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def hash_file_or_none(hash_func, path):
+	"""
+	[hash_func](path), or None when the file vanished or can no
+	longer be read since the scan.
+	"""
+	try:
+		return hash_func(path)
+	except OSError:
+		return None
+		
+def hash_file_batch(hash_func, file_paths):
+	return [hash_file_or_none(hash_func, path) for path in file_paths]
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def hash_files(file_paths, hash_func, jobs=1, backend='thread', progress=None,\
+	file_sizes=None):
+	"""
+	Return [hash_func](path) for each of [file_paths], in input order,
+	with None for files that can no longer be read.
+	
+	parameters:
+		file_paths - list of file paths.
+		hash_func - picklable callable, path -> hash string.
+		jobs - int, number of workers. 1 hashes in the calling thread.
+		backend - 'thread' or 'process' worker pool.
+		progress - optional ProgressBar, stepped once per file.
+		file_sizes - optional list of sizes, passed to [progress]
+			as the bytes done per file.
+		
+	Results are stored by input index, so the output does not depend
+	on the order in which workers finish. At most 4 batches per worker
+	are in flight, which keeps memory flat for very long file lists.
+	"""
+	file_hashes = [None] * len(file_paths)
+	
+	if file_sizes is None:
+		file_sizes = [0] * len(file_paths)
+	
+	if jobs <= 1:
+		for index, path in enumerate(file_paths):
+			file_hashes[index] = hash_file_or_none(hash_func, path)
+			if progress is not None:
+				progress(file_sizes[index])
+		return file_hashes
+	
+	if backend == 'process':
+		executor_cls = concurrent.futures.ProcessPoolExecutor
+		batchsize = 32	# amortize pickling and IPC over several files
+	else:
+		executor_cls = concurrent.futures.ThreadPoolExecutor
+		batchsize = 1
+		
+	def collect(done_futures):
+		for future in done_futures:
+			start = future_dict.pop(future)
+			batch_hashes = future.result()
+			file_hashes[start:start + len(batch_hashes)] = batch_hashes
+			if progress is not None:
+				for index in range(start, start + len(batch_hashes)):
+					progress(file_sizes[index])
+	
+	future_dict = {}
+	with executor_cls(max_workers=jobs) as executor:
+		for start in range(0, len(file_paths), batchsize):
+			batch = file_paths[start:start + batchsize]
+			future_dict[executor.submit(hash_file_batch, hash_func, batch)] = start
+			if len(future_dict) >= jobs * 4:
+				done_futures, _ = concurrent.futures.wait(future_dict,\
+					return_when=concurrent.futures.FIRST_COMPLETED)
+				collect(done_futures)
+		collect(concurrent.futures.as_completed(list(future_dict)))
+		
+	return file_hashes
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def split_groups_by_hash(file_groups, hash_func, jobs=1, backend='thread',\
+	cache=None, kind='', file_size_dict=None, read_limit=0, timer=None):
+	"""
+	Split each group of candidate files by [hash_func](path).
+	Members left alone in a split can't be duplicates and are dropped,
+	as are files that could not be read.
+	
+	When a Hash_Cache is given, digests of [kind] are looked up
+	before any file is read, and only misses are hashed.
+	With [file_size_dict] the progress bar shows MB/s and ETA;
+	[read_limit] caps the bytes [hash_func] reads per file.
+	Files, bytes read and cache hits are counted on [timer].
+	
+	returns:
+		list of file path lists, each with two or more members.
+	"""
+	file_paths = [path for group in file_groups for path in group]
+	
+	if file_size_dict is None:
+		file_sizes = [0] * len(file_paths)
+		progress = ProgressBar(len(file_paths), fmt=ProgressBar.FULL)
+	else:
+		file_sizes = [file_size_dict[path] for path in file_paths]
+		if read_limit > 0:
+			file_sizes = [min(filesize, read_limit) for filesize in file_sizes]
+		progress = ProgressBar(len(file_paths), fmt=ProgressBar.BYTES,\
+			total_bytes=sum(file_sizes))
+	
+	if cache is None:
+		file_hashes = hash_files(file_paths, hash_func, jobs, backend, progress, file_sizes)
+		miss_indexes = range(len(file_paths))
+	else:
+		file_hashes, stat_keys = cache.get_hashes(file_paths, kind)
+		miss_indexes = [index for index, file_hash in enumerate(file_hashes) if file_hash is None]
+		for index, file_hash in enumerate(file_hashes):
+			if file_hash is not None:
+				progress(file_sizes[index])
+		miss_paths = [file_paths[index] for index in miss_indexes]
+		miss_hashes = hash_files(miss_paths, hash_func, jobs, backend, progress,\
+			[file_sizes[index] for index in miss_indexes])
+		for index, file_hash in zip(miss_indexes, miss_hashes):
+			file_hashes[index] = file_hash
+		cache.put_hashes(miss_paths, [stat_keys[index] for index in miss_indexes],\
+			miss_hashes, kind)
+	
 	progress.close()
 	
-	return duplicate_files
+	if timer is not None:
+		timer.count('files_hashed', len(miss_indexes))
+		timer.count('bytes_read', sum(file_sizes[index] for index in miss_indexes))
+		timer.count('cache_hits', len(file_paths) - len(miss_indexes))
+	
+	split_groups = []
+	index = 0
+	for group in file_groups:
+		file_hash_dict = {}
+		for path in group:
+			if file_hashes[index] is not None:
+				file_hash_dict.setdefault(file_hashes[index], []).append(path)
+			index += 1
+		for paths in file_hash_dict.values():
+			if len(paths) > 1:
+				split_groups.append(paths)
+	
+	return split_groups
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
 
+def write_stage_msg(msgr, stage, before_count, after_count, elapsed=None):
+	if msgr is not None:
+		msgr.write_msg(f'{LF}{stage} stage: {before_count - after_count} of {before_count} file(s) eliminated.{LF}')
+		msgr.write_event('stage', stage=stage, files_in=before_count,\
+			files_out=after_count, seconds=elapsed)
+		
 #-------------------------------------------------------------
 # 
 #-------------------------------------------------------------
 
-def dupl_main(msgr):
+def group_hardlinks(selected_files):
+	"""
+	Return groups of paths that are hardlinks to the same
+	(device, inode), as a list of file path lists with two or
+	more members each. find_duplicate_files() keeps only the
+	first path of each group.
+	"""
+	if isinstance(selected_files, FileTable):
+		return [selected_files.get_paths(rows) for rows in selected_files.group_by_inode()]
+		
+	inode_dict = {}
+	for path in selected_files:
+		try:
+			_stat = os.stat(path)
+		except OSError:
+			continue	# vanished or unreadable since the scan
+		if _stat.st_nlink > 1:
+			inode_dict.setdefault((_stat.st_dev, _stat.st_ino), []).append(path)
+	return [paths for paths in inode_dict.values() if len(paths) > 1]
 	
-	arg_list = [
-			Parse_Arg(name='-ChunkSize', default_value=4096, is_required=False, help_text=''),
-			Parse_Arg(name='-MinFileSize', default_value=1, is_required=False, help_text=''),
-			Parse_Arg(name='-InclDirUserInput', default_value=False, is_required=False, help_text=''),
-			Parse_Arg(name='-InclDirList', default_value=[Parse_Arg.curdir], is_required=False, help_text=''),
-			Parse_Arg(name='-ExclDirList', default_value=[], is_required=False,help_text='')
-		]
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def find_duplicate_files(selected_files, chunksize=0, file_size_dict=None, msgr=None,\
+	samplesize=0, jobs=1, backend='thread', cache=None, io_backend='readinto', algo='md5',\
+	timer=None):
+	"""
+	Return groups of files with equal content hashes, as a list of
+	file path lists with two or more members each.
 	
-	Parse_Arg.setup(arg_list)
+	Files are bucketed by size first. When [samplesize] > 0, a
+	head/tail sample hash splits the buckets before the full hash,
+	and only groups that still collide are read end to end.
+	With [jobs] > 1 each stage hashes on a [backend] worker pool.
+	Digests are reused from [cache] (a Hash_Cache) when given.
 	
-	#pargs = Parse_Arg.get_parsed_args()
-	#msgr.write_msg(f'{LF} {pargs}')
+	[selected_files] is a list of paths or a FileTable. For a
+	FileTable the size stage runs on its columns, and only the
+	paths of files in a size group are decoded.
 	
-	chunksize = Parse_Arg.get_arg_by_name('ChunkSize')
-	msgr.write_msg(f'{LF}chunksize: {chunksize}')
-	min_file_size = Parse_Arg.get_arg_by_name('MinFileSize')
+	Hardlinks to one (device, inode) are collapsed to their first
+	path before hashing, so each physical file is read once and
+	links are not reported as duplicates; see group_hardlinks().
 	
-	curdir = str(pathlib.Path().cwd())
+	Each stage runs in a span of [timer] (a MY_Timer) when given.
+	"""
+	with timer_span(timer, 'size'):
+		size_groups, file_size_dict, skipped_bytes, file_count =\
+			group_candidates_by_size(selected_files, file_size_dict)
+		if timer is not None:
+			timer.count('files', len(selected_files))
+	return hash_size_groups(list(size_groups.values()), file_size_dict, len(selected_files),\
+		file_count, skipped_bytes, chunksize, msgr, samplesize, jobs, backend, cache,\
+		io_backend, algo, timer)
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def group_candidates_by_size(selected_files, file_size_dict=None) -> tuple:
+	"""
+	Collapse hardlinks and bucket [selected_files] by size.
 	
-	yn = 'n'
-	yn = str(input(f'{LF}Use {curdir} as selected directory? [Y/N]:')).lower()
-	if yn == 'y':
-		selected_dir = curdir
+	returns:
+		size_groups - dict, file size -> list of two or more paths.
+		file_size_dict - dict, file path -> file size.
+		skipped_bytes - int, bytes in unique-size files.
+		file_count - int, files left after collapsing hardlinks.
+	"""
+	if isinstance(selected_files, FileTable):
+		unique_rows = selected_files.unique_inodes()
+		file_size_dict = {}
+		size_groups = {}
+		for filesize, rows in selected_files.group_by_size(unique_rows).items():
+			size_groups[filesize] = selected_files.get_paths(rows)
+			for path in size_groups[filesize]:
+				file_size_dict[path] = filesize
+		skipped_bytes = sum(selected_files.sizes[row] for row in unique_rows)\
+			- sum(filesize * len(paths) for filesize, paths in size_groups.items())
+		file_count = len(unique_rows)
 	else:
-		selected_dir = select_dir()
+		fill_sizes = file_size_dict is None
+		if fill_sizes:
+			file_size_dict = {}
+		unique_files = []
+		inode_set = set()
+		for path in selected_files:
+			try:
+				_stat = os.stat(path)
+			except OSError:
+				continue	# vanished or unreadable since the scan
+			if _stat.st_nlink > 1:
+				if (_stat.st_dev, _stat.st_ino) in inode_set:
+					continue
+				inode_set.add((_stat.st_dev, _stat.st_ino))
+			unique_files.append(path)
+			if fill_sizes:
+				file_size_dict[path] = _stat.st_size
+		size_groups, skipped_bytes = group_files_by_size(unique_files, file_size_dict)
+		file_count = len(unique_files)
 		
-	msgr.write_msg(f'{LF}Scanning for duplicate files...{LF}{LF}')
+	return size_groups, file_size_dict, skipped_bytes, file_count
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def hash_size_groups(file_groups, file_size_dict, selected_count, file_count, skipped_bytes,\
+	chunksize=0, msgr=None, samplesize=0, jobs=1, backend='thread', cache=None,\
+	io_backend='readinto', algo='md5', timer=None) -> list:
+	"""
+	Report the size stage, then run the sample and full hash stages
+	of find_duplicate_files() on the size groups [file_groups].
+	"""
+	candidate_count = sum(len(group) for group in file_groups)
+	
+	if msgr is not None:
+		if file_count < selected_count:
+			msgr.write_msg(f'{LF}inode stage: {selected_count - file_count} hardlink alias(es) not read.')
+			msgr.write_event('stage', stage='inode', files_in=selected_count,\
+				files_out=file_count)
+		skipped_count = file_count - candidate_count
+		msgr.write_msg(f'{LF}size stage: {skipped_count} of {file_count} file(s) have a unique size, {skipped_bytes} bytes not read.{LF}')
+		msgr.write_event('stage', stage='size', files_in=file_count,\
+			files_out=candidate_count, bytes_skipped=skipped_bytes)
+	
+	full_hash_groups = file_groups
+	sampled_groups = []
+	
+	if samplesize > 0:
+		start_time = time.perf_counter()
+		with timer_span(timer, 'sample'):
+			file_groups = split_groups_by_hash(file_groups,\
+				functools.partial(get_file_sample_hash, samplesize=samplesize, algo=algo),\
+				jobs, backend, cache, f'sample:{samplesize}:{algo}', file_size_dict,\
+				2 * samplesize, timer)
+		sample_count = sum(len(group) for group in file_groups)
+		write_stage_msg(msgr, 'sample', candidate_count, sample_count,\
+			time.perf_counter() - start_time)
+		candidate_count = sample_count
 		
-	file_path_list = build_file_list(selected_dir)
+		# a sample of a small file already covers the whole file
+		full_hash_groups = [group for group in file_groups\
+			if file_size_dict[group[0]] > 2 * samplesize]
+		sampled_groups = [group for group in file_groups\
+			if file_size_dict[group[0]] <= 2 * samplesize]
+		candidate_count = sum(len(group) for group in full_hash_groups)
 	
-	selected_files = []
-	for path in file_path_list:
-		fn = clsFileNode(path)
-		fn_dict = fn.as_dict()
-		fn_include = (fn_dict['filesize'] >= min_file_size)
-		if fn_include:
-			selected_files.append(path)
+	start_time = time.perf_counter()
+	with timer_span(timer, 'full hash'):
+		file_groups = split_groups_by_hash(full_hash_groups,\
+			functools.partial(get_file_hash, chunksize=chunksize, io_backend=io_backend, algo=algo),\
+			jobs, backend, cache, f'full:{algo}', file_size_dict, timer=timer)
+	# groups settled by the sample stage were not full hashed and are not counted
+	full_count = sum(len(group) for group in file_groups)
+	write_stage_msg(msgr, 'full hash', candidate_count, full_count,\
+		time.perf_counter() - start_time)
+	file_groups.extend(sampled_groups)
 	
+	return file_groups
 	
-	duplicate_candidates = find_duplicate_files(selected_files, chunksize)
-	duplicate_pair_list = []
-	if duplicate_candidates:
-		for file1, file2 in duplicate_candidates:
-			if filecmp.cmp(file1, file2, shallow=False):
-				duplicate_pair_list.append((file1, file2))
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+class Scan_Pipeline:
+	"""
+	Walk, filter, size-group and hash as one streaming pipeline.
+	
+	A walker thread feeds batches of (path, stat) into a bounded
+	queue. The calling thread filters them by size and inode, adds
+	them to a FileTable and buckets them by size. As soon as a size
+	bucket has a second member, its files go to the [backend] hash
+	pool, so content reads overlap the rest of the walk. Digests go
+	to the table's digest column and are grouped from there.
+	
+	At most 4 hash batches per worker are in flight; when the pool
+	falls behind, the queue fills and the walker waits.
+	"""
+	QUEUE_BATCHES = 16
+	WALK_BATCHSIZE = 256
+	HASH_BATCHSIZE = 16
+	
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def __init__(self, hash_func, jobs=1, backend='thread', cache=None, kind='', min_file_size=1,\
+		read_limit=0):
+		self.hash_func = hash_func
+		self.jobs = max(1, jobs)
+		self.backend = backend
+		self.cache = cache
+		self.kind = kind
+		self.min_file_size = min_file_size
+		self.read_limit = read_limit
 		
-	msgr.write_msg(f'{LF}Scanning complete.')
+		self.file_table = FileTable()
+		self.file_size_dict = {}
+		self.progress = None
+		self.walked_cnt = 0
+		self.alias_cnt = 0
+		self.hashed_cnt = 0
+		self.read_byte_cnt = 0
+		self.cache_hit_cnt = 0
+		
+		self._size_dict = {}
+		self._pending_rows = []
+		self._future_dict = {}
+		self._put_rows = []
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _walk(self, walk_queue, root_list, excl_dir_list, snapshot):
+		try:
+			batch = []
+			walked_roots = []
+			for root in root_list:
+				# overlapping roots are walked once
+				nested_list = get_nested_roots(root, walked_roots)
+				if nested_list is None:
+					continue
+				walked_roots.append(root)
+				_excl_dir_list = list(excl_dir_list or []) + nested_list
+				if snapshot is None:
+					_walk = walk_files(root, excl_dir_list=_excl_dir_list)
+				else:
+					_walk = snapshot.walk_files(root, excl_dir_list=_excl_dir_list)
+				for item in _walk:
+					batch.append(item)
+					if len(batch) >= Scan_Pipeline.WALK_BATCHSIZE:
+						walk_queue.put(batch)
+						batch = []
+			if batch:
+				walk_queue.put(batch)
+			walk_queue.put(None)
+		except BaseException as e:
+			walk_queue.put(e)
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _get_read_size(self, row) -> int:
+		filesize = self.file_table.sizes[row]
+		return min(filesize, self.read_limit) if self.read_limit > 0 else filesize
+		
+	def _collect(self, done_futures):
+		for future in done_futures:
+			rows, stat_keys = self._future_dict.pop(future)
+			for row, stat_key, file_hash in zip(rows, stat_keys, future.result()):
+				self.progress(self._get_read_size(row))
+				if file_hash is None:
+					continue
+				self.file_table.set_digest(row, file_hash)
+				if self.cache is not None:
+					self._put_rows.append((self.file_table.get_path(row), stat_key, file_hash))
+			self.hashed_cnt += len(rows)
+			
+	def _submit_pending(self, executor):
+		rows = self._pending_rows
+		self._pending_rows = []
+		if not rows:
+			return
+		# the totals grow with the walk; the bar shows progress on the files found so far
+		self.progress.total += len(rows)
+		self.progress.total_bytes += sum(self._get_read_size(row) for row in rows)
+		paths = self.file_table.get_paths(rows)
+		stat_keys = [None] * len(rows)
+		if self.cache is not None:
+			file_hashes, stat_keys = self.cache.get_hashes(paths, self.kind)
+			miss_indexes = []
+			for index, file_hash in enumerate(file_hashes):
+				if file_hash is None:
+					miss_indexes.append(index)
+				else:
+					self.file_table.set_digest(rows[index], file_hash)
+					self.progress(self._get_read_size(rows[index]))
+			self.cache_hit_cnt += len(rows) - len(miss_indexes)
+			rows = [rows[index] for index in miss_indexes]
+			paths = [paths[index] for index in miss_indexes]
+			stat_keys = [stat_keys[index] for index in miss_indexes]
+			if not rows:
+				return
+				
+		for row in rows:
+			self.read_byte_cnt += self._get_read_size(row)
+			
+		if len(self._future_dict) >= self.jobs * 4:
+			done_futures, _ = concurrent.futures.wait(self._future_dict,\
+				return_when=concurrent.futures.FIRST_COMPLETED)
+			self._collect(done_futures)
+		future = executor.submit(hash_file_batch, self.hash_func, paths)
+		self._future_dict[future] = (rows, stat_keys)
+		
+	def _queue_row(self, executor, row):
+		self._pending_rows.append(row)
+		if len(self._pending_rows) >= Scan_Pipeline.HASH_BATCHSIZE:
+			self._submit_pending(executor)
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def run(self, root_list, excl_dir_list=None, snapshot=None) -> list:
+		"""
+		Scan [root_list] and return the size buckets split by hash,
+		as a list of file path lists with two or more members each,
+		in the same order find_duplicate_files() would produce.
+		Their sizes are kept in file_size_dict, and hash progress is
+		drawn in bytes as the files are found.
+		"""
+		walk_queue = queue.Queue(maxsize=Scan_Pipeline.QUEUE_BATCHES)
+		walker = threading.Thread(target=self._walk,\
+			args=(walk_queue, root_list, excl_dir_list, snapshot), daemon=True)
+		walker.start()
+		
+		if self.backend == 'process':
+			executor_cls = concurrent.futures.ProcessPoolExecutor
+		else:
+			executor_cls = concurrent.futures.ThreadPoolExecutor
+			
+		table = self.file_table
+		inode_set = set()
+		self.progress = ProgressBar(0, fmt=ProgressBar.BYTES, total_bytes=0)
+		with executor_cls(max_workers=self.jobs) as executor:
+			while True:
+				batch = walk_queue.get()
+				if batch is None:
+					break
+				if isinstance(batch, BaseException):
+					raise batch
+				self.walked_cnt += len(batch)
+				for path, _stat in batch:
+					if _stat.st_size < self.min_file_size:
+						continue
+					row = len(table)
+					table.append(path, _stat)
+					if _stat.st_nlink > 1:
+						if (_stat.st_dev, _stat.st_ino) in inode_set:
+							self.alias_cnt += 1
+							continue
+						inode_set.add((_stat.st_dev, _stat.st_ino))
+					rows = self._size_dict.setdefault(_stat.st_size, [])
+					rows.append(row)
+					if len(rows) == 2:
+						self._queue_row(executor, rows[0])
+						self._queue_row(executor, rows[1])
+					elif len(rows) > 2:
+						self._queue_row(executor, row)
+						
+			self._submit_pending(executor)
+			self._collect(concurrent.futures.as_completed(list(self._future_dict)))
+		walker.join()
+		self.progress.close()
+		
+		if self.cache is not None and self._put_rows:
+			paths, stat_keys, file_hashes = zip(*self._put_rows)
+			self.cache.put_hashes(paths, stat_keys, file_hashes, self.kind)
+			self._put_rows = []
+			
+		split_groups = []
+		for rows in self._size_dict.values():
+			if len(rows) > 1:
+				for hash_rows in table.group_by_digest(rows):
+					split_groups.append(table.get_paths(hash_rows))
+					for row, path in zip(hash_rows, split_groups[-1]):
+						self.file_size_dict[path] = table.sizes[row]
+		return split_groups
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
-	return duplicate_pair_list
+	def get_candidate_count(self) -> int:
+		return sum(len(rows) for rows in self._size_dict.values() if len(rows) > 1)
+		
+	def get_unique_count(self) -> int:
+		return len(self.file_table) - self.alias_cnt
+		
+	def get_skipped_bytes(self) -> int:
+		"""
+		Bytes in files with a unique size, which are never read.
+		"""
+		return sum(size for size, rows in self._size_dict.items() if len(rows) == 1)
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
 
+def find_duplicate_files_pipelined(root_list, excl_dir_list=None, min_file_size=1,\
+	chunksize=0, msgr=None, samplesize=0, jobs=1, backend='thread', cache=None,\
+	io_backend='readinto', algo='md5', snapshot=None, timer=None) -> tuple:
+	"""
+	Like find_duplicate_files(), but walks [root_list] itself through a
+	Scan_Pipeline, so the first hash stage runs during the walk.
+	The walk and first hash share one 'walk and hash' span of [timer].
+	
+	returns:
+		file_table - FileTable of the files of at least [min_file_size].
+		file_groups - list of file path lists of candidate duplicates.
+	"""
+	start_time = time.perf_counter()
+	
+	if samplesize > 0:
+		first_hash_func = functools.partial(get_file_sample_hash, samplesize=samplesize, algo=algo)
+		first_kind = f'sample:{samplesize}:{algo}'
+	else:
+		first_hash_func = functools.partial(get_file_hash, chunksize=chunksize,\
+			io_backend=io_backend, algo=algo)
+		first_kind = f'full:{algo}'
+		
+	pipeline = Scan_Pipeline(first_hash_func, jobs, backend, cache, first_kind, min_file_size,\
+		2 * samplesize)
+	with timer_span(timer, 'walk and hash'):
+		file_groups = pipeline.run(root_list, excl_dir_list, snapshot)
+		if timer is not None:
+			timer.count('files', pipeline.walked_cnt)
+			timer.count('stat_calls', pipeline.walked_cnt if snapshot is None else snapshot.stat_cnt)
+			timer.count('files_hashed', pipeline.hashed_cnt)
+			timer.count('bytes_read', pipeline.read_byte_cnt)
+			timer.count('cache_hits', pipeline.cache_hit_cnt)
+	file_table = pipeline.file_table
+	
+	file_count = pipeline.get_unique_count()
+	candidate_count = pipeline.get_candidate_count()
+	skipped_bytes = pipeline.get_skipped_bytes()
+	if msgr is not None:
+		msgr.write_msg(f'{LF}walk: {pipeline.walked_cnt} file(s), {len(file_table)} of at least {min_file_size} bytes.')
+		if pipeline.alias_cnt:
+			msgr.write_msg(f'{LF}inode stage: {pipeline.alias_cnt} hardlink alias(es) not read.')
+		msgr.write_msg(f'{LF}size stage: {file_count - candidate_count} of {file_count} file(s) have a unique size, {skipped_bytes} bytes not read.{LF}')
+		msgr.write_event('stage', stage='size', files_in=file_count,\
+			files_out=candidate_count, bytes_skipped=skipped_bytes)
+	write_stage_msg(msgr, 'sample' if samplesize > 0 else 'full hash', candidate_count,\
+		sum(len(group) for group in file_groups), time.perf_counter() - start_time)
+		
+	if samplesize > 0:
+		file_size_dict = pipeline.file_size_dict
+		# a sample of a small file already covers the whole file
+		full_hash_groups = [group for group in file_groups\
+			if file_size_dict[group[0]] > 2 * samplesize]
+		sampled_groups = [group for group in file_groups\
+			if file_size_dict[group[0]] <= 2 * samplesize]
+		candidate_count = sum(len(group) for group in full_hash_groups)
+		
+		start_time = time.perf_counter()
+		with timer_span(timer, 'full hash'):
+			file_groups = split_groups_by_hash(full_hash_groups,\
+				functools.partial(get_file_hash, chunksize=chunksize, io_backend=io_backend, algo=algo),\
+				jobs, backend, cache, f'full:{algo}', file_size_dict, timer=timer)
+		write_stage_msg(msgr, 'full hash', candidate_count,\
+			sum(len(group) for group in file_groups), time.perf_counter() - start_time)
+		file_groups.extend(sampled_groups)
 		
+	return file_table, file_groups
+	
 #-------------------------------------------------------------
 # 
 #-------------------------------------------------------------
 
+MAX_VERIFY_OPEN_FILES = 256
+VERIFY_CHUNKSIZE = 64 * 1024
+FD_EXHAUSTED_ERRNOS = (errno.EMFILE, errno.ENFILE)
 
-def main():
+def get_max_verify_open_files() -> int:
+	"""
+	Files the verify stage may hold open at once: MAX_VERIFY_OPEN_FILES,
+	or half the soft RLIMIT_NOFILE when that is lower, leaving the rest
+	for the log, the caches and the worker pools.
+	"""
+	max_open = MAX_VERIFY_OPEN_FILES
+	if resource is not None:
+		soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+		if soft_limit != resource.RLIM_INFINITY:
+			max_open = min(max_open, soft_limit // 2)
+	return max(2, max_open)
+	
+
+def verify_files_lockstep(file_paths, chunksize=VERIFY_CHUNKSIZE, timer=None) -> list:
+	"""
+	Byte-compare [file_paths] by reading one chunk of every file per
+	step and splitting the files wherever the chunks differ. Each file
+	is read once; files are closed as soon as they stand alone.
+	Files that vanished or can no longer be read are left out; running
+	out of file descriptors raises OSError (EMFILE or ENFILE). Opens
+	and bytes read are counted on [timer].
+	
+	returns:
+		list of file path lists of identical files, two or more each.
+	"""
+	verified_groups = []
+	file_list = []
+	open_paths = []
+	try:
+		for path in file_paths:
+			try:
+				file_list.append(open(path, 'rb'))
+			except OSError as e:
+				if e.errno in FD_EXHAUSTED_ERRNOS:
+					raise
+				continue
+			open_paths.append(path)
+			
+		byte_cnt = 0
+		pending_groups = [list(range(len(file_list)))]
+		while pending_groups:
+			next_groups = []
+			for group in pending_groups:
+				chunk_dict = {}
+				for index in group:
+					chunk_dict.setdefault(file_list[index].read(chunksize), []).append(index)
+				for chunk, indexes in chunk_dict.items():
+					byte_cnt += len(chunk) * len(indexes)
+					if len(indexes) < 2:
+						file_list[indexes[0]].close()
+					elif chunk == b'':
+						verified_groups.append(indexes)
+					else:
+						next_groups.append(indexes)
+			pending_groups = next_groups
+		if timer is not None:
+			timer.count('opens', len(file_list))
+			timer.count('bytes_read', byte_cnt)
+	finally:
+		for f in file_list:
+			f.close()
+			
+	verified_groups.sort()
+	return [[open_paths[index] for index in group] for group in verified_groups]
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def verify_duplicate_group(file_paths, chunksize=VERIFY_CHUNKSIZE, timer=None,\
+	max_open_files=None) -> list:
+	"""
+	Split a candidate group into groups of byte-identical files.
+	
+	Groups larger than [max_open_files] (default
+	get_max_verify_open_files()) are verified in batches, each
+	including a leader file, and the batch groups holding the leader
+	are merged. Files that differ from the leader are verified again
+	against a new leader, which only happens on a hash collision.
+	When the process runs out of file descriptors anyway, the batch
+	size is halved and the group verified again.
+	"""
+	if max_open_files is None:
+		max_open_files = get_max_verify_open_files()
+	while True:
+		try:
+			return verify_group_in_batches(file_paths, chunksize, timer, max_open_files)
+		except OSError as e:
+			if e.errno not in FD_EXHAUSTED_ERRNOS or max_open_files <= 2:
+				raise
+			max_open_files //= 2
+			
+def verify_group_in_batches(file_paths, chunksize, timer, max_open_files) -> list:
+	if len(file_paths) <= max_open_files:
+		return verify_files_lockstep(file_paths, chunksize, timer)
+		
+	verified_groups = []
+	remaining_paths = file_paths
+	batchsize = max_open_files - 1
+	while len(remaining_paths) > 1:
+		leader_path = remaining_paths[0]
+		leader_group = [leader_path]
+		for start in range(1, len(remaining_paths), batchsize):
+			batch = [leader_path] + remaining_paths[start:start + batchsize]
+			for group in verify_files_lockstep(batch, chunksize, timer):
+				if group[0] == leader_path:
+					leader_group.extend(group[1:])
+					
+		if len(leader_group) > 1:
+			verified_groups.append(leader_group)
+		leader_set = set(leader_group)
+		remaining_paths = [path for path in remaining_paths if path not in leader_set]
+		
+	return verified_groups
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+# Content-defined chunking: a cut is made where a rolling hash
+# of the last CDC_WINDOW bytes has its low bits all zero, so an
+# insert near the start of a file only moves the nearby cuts and
+# the later chunks still line up with the other file.
+#
+# The rolling hash is the windowed sum of a fixed random value
+# per byte (a gear table). It depends only on the window bytes,
+# and with numpy it is a cumsum and a subtraction per buffer.
+
+CDC_WINDOW = 48
+CDC_BUFSIZE = 4 * 1024 * 1024
+CDC_DIGEST_SIZE = 16
+
+_cdc_rng = random.Random(0x5EED)
+CDC_GEAR_TABLE = [_cdc_rng.getrandbits(32) for _ in range(256)]
+del _cdc_rng
+
+def find_chunk_cuts(buf, avg_size, min_size, max_size) -> list:
+	"""
+	Return the chunk end offsets in [buf], which starts at a chunk
+	boundary. The tail after the last offset is an unfinished chunk.
+	"""
+	mask = avg_size - 1
+	if numpy is not None:
+		_gear = numpy.array(CDC_GEAR_TABLE, dtype=numpy.uint64)
+		_sums = numpy.cumsum(_gear[numpy.frombuffer(buf, dtype=numpy.uint8)], dtype=numpy.uint64)
+		# a cut after byte i when the window ending at byte i matches
+		_hits = numpy.flatnonzero(((_sums[CDC_WINDOW:] - _sums[:-CDC_WINDOW]) & mask) == 0)
+		candidate_list = (_hits + CDC_WINDOW + 1).tolist()
+	else:
+		candidate_list = []
+		rolling_sum = 0
+		for index in range(len(buf)):
+			rolling_sum += CDC_GEAR_TABLE[buf[index]]
+			if index >= CDC_WINDOW:
+				rolling_sum -= CDC_GEAR_TABLE[buf[index - CDC_WINDOW]]
+				if (rolling_sum & mask) == 0:
+					candidate_list.append(index + 1)
+					
+	cut_list = []
+	last_cut = 0
+	candidate_index = 0
+	while True:
+		candidate_index = bisect.bisect_left(candidate_list, last_cut + min_size, candidate_index)
+		if candidate_index < len(candidate_list) and candidate_list[candidate_index] <= last_cut + max_size:
+			last_cut = candidate_list[candidate_index]
+		elif last_cut + max_size <= len(buf):
+			last_cut += max_size
+		else:
+			break
+		cut_list.append(last_cut)
+	return cut_list
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_file_chunks(file_path, avg_size=64 * 1024) -> list:
+	"""
+	Split a file into content-defined chunks of about [avg_size]
+	bytes (a power of two), at least avg_size / 4 and at most
+	avg_size * 8.
+	
+	returns:
+		list of (chunk length, chunk digest bytes).
+	"""
+	min_size = max(avg_size // 4, CDC_WINDOW)
+	max_size = avg_size * 8
+	chunk_list = []
+	pending = b''
+	with open(file_path, 'rb') as f:
+		while True:
+			block = f.read(CDC_BUFSIZE)
+			if not block:
+				break
+			buf = pending + block
+			last_cut = 0
+			for cut in find_chunk_cuts(buf, avg_size, min_size, max_size):
+				chunk_list.append((cut - last_cut,\
+					hashlib.blake2b(buf[last_cut:cut], digest_size=CDC_DIGEST_SIZE).digest()))
+				last_cut = cut
+			pending = buf[last_cut:]
+	if pending:
+		chunk_list.append((len(pending),\
+			hashlib.blake2b(pending, digest_size=CDC_DIGEST_SIZE).digest()))
+	return chunk_list
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+class Chunk_Index:
+	"""
+	Memory-bounded index of chunk digests across files.
+	
+	Each digest is stored once with its length, the first
+	MAX_HOLDERS files that held it, and a count. A later chunk with
+	a known digest adds its length to the dedupable bytes and to the
+	bytes the file shares with each of those holders, once per file
+	however often the chunk repeats in it. Sharing with a
+	file past the first MAX_HOLDERS holders of a chunk is not
+	credited to that pair.
+	
+	When the index grows past [max_entries], it keeps only digests
+	whose value is 0 modulo a doubled sampling divisor. The choice
+	depends on the digest alone, so a sampled chunk is sampled in
+	every file. Byte figures are then estimates, scaled by the
+	divisor in effect when each chunk was seen.
+	
+	The file pair totals are bounded too: past [max_pairs] pairs,
+	only the half with the most shared bytes is kept, and pairs
+	dropped and seen again restart from zero.
+	"""
+	MAX_HOLDERS = 4
+	
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
 	
-	program_path = __file__
-	fileprefix = str(pathlib.Path(program_path).stem)
+	def __init__(self, max_entries=4000000, max_pairs=None):
+		self.max_entries = max_entries
+		self.max_pairs = max(2, max_entries // 4 if max_pairs is None else max_pairs)
+		self.sample_mod = 1
+		self.chunk_dict = {}
+		self.pair_dict = {}
+		self.pair_prune_cnt = 0
+		self.file_list = []
+		self.total_bytes = 0
+		self.chunk_cnt = 0
+		self.dedup_bytes = 0
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
-	Message_Writer.setup()
+	def add_file(self, path, filesize, chunk_list) -> int:
+		file_id = len(self.file_list)
+		self.file_list.append((path, filesize))
+		
+		for length, digest in chunk_list:
+			self.total_bytes += length
+			self.chunk_cnt += 1
+			if int.from_bytes(digest[:8], 'little') % self.sample_mod:
+				continue
+			entry = self.chunk_dict.get(digest)
+			if entry is None:
+				self.chunk_dict[digest] = [length, [file_id], 1, file_id]
+				continue
+			entry[2] += 1
+			shared_bytes = length * self.sample_mod
+			self.dedup_bytes += shared_bytes
+			if entry[3] == file_id:
+				continue	# repeated within this file, already credited
+			entry[3] = file_id
+			holders = entry[1]
+			for holder_id in holders:
+				pair = (holder_id, file_id)
+				self.pair_dict[pair] = self.pair_dict.get(pair, 0) + shared_bytes
+			if len(holders) < Chunk_Index.MAX_HOLDERS:
+				holders.append(file_id)
+				
+		while len(self.chunk_dict) > self.max_entries:
+			self.sample_mod *= 2
+			self.chunk_dict = {digest: entry for digest, entry in self.chunk_dict.items()\
+				if int.from_bytes(digest[:8], 'little') % self.sample_mod == 0}
+		if len(self.pair_dict) > self.max_pairs:
+			pair_list = sorted(self.pair_dict.items(), key=lambda item: -item[1])
+			self.pair_dict = dict(pair_list[:self.max_pairs // 2])
+			self.pair_prune_cnt += 1
+		return file_id
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
-	msgr = Message_Writer(name='root',prefix=fileprefix)
+	def is_estimate(self) -> bool:
+		return self.sample_mod > 1
+		
+	def iter_pairs(self, top_n=None):
+		"""
+		Yield (path_a, path_b, shared bytes, percent of the smaller
+		file), largest shared bytes first.
+		"""
+		pair_list = sorted(self.pair_dict.items(), key=lambda item: (-item[1], item[0]))
+		if top_n is not None:
+			pair_list = pair_list[:top_n]
+		for (id_a, id_b), shared_bytes in pair_list:
+			path_a, size_a = self.file_list[id_a]
+			path_b, size_b = self.file_list[id_b]
+			smaller_size = min(size_a, size_b)
+			percent = 100.0 * min(shared_bytes, smaller_size) / smaller_size if smaller_size else 0.0
+			yield path_a, path_b, shared_bytes, percent
+			
+	def as_str(self) -> str:
+		percent = 100.0 * self.dedup_bytes / self.total_bytes if self.total_bytes else 0.0
+		_msg = f'{LF}<{self.__class__.__name__}> files: {len(self.file_list)} chunks: {self.chunk_cnt} '\
+			f'indexed: {len(self.chunk_dict)} bytes: {self.total_bytes} '\
+			f'dedupable: {self.dedup_bytes} ({percent:.1f}%)'
+		if self.is_estimate():
+			_msg += f' estimated, 1 in {self.sample_mod} chunks sampled'
+		if self.pair_prune_cnt:
+			_msg += f' file pairs: top {len(self.pair_dict)} kept'
+		return _msg
+		
+	def __repr__(self) -> str:
+		return self.as_str()
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def analyze_block_dedup(file_paths, file_sizes, avg_size=64 * 1024, jobs=1, backend='thread',\
+	max_entries=4000000, timer=None):
+	"""
+	Chunk [file_paths] on a [backend] pool of [jobs] workers and
+	index the chunks in input order. Returns the Chunk_Index.
+	Files that can no longer be read are skipped.
+	"""
+	chunk_index = Chunk_Index(max_entries)
+	chunk_func = functools.partial(get_file_chunks, avg_size=avg_size)
+	progress = ProgressBar(len(file_paths), fmt=ProgressBar.BYTES, total_bytes=sum(file_sizes))
 	
-	msgr.write_msg(f'{LF}program {program_path} started. {LF}')
+	# chunk lists are indexed batch by batch, so only one batch is held
+	batchsize = max(1, jobs) * 16
+	for start in range(0, len(file_paths), batchsize):
+		batch_paths = file_paths[start:start + batchsize]
+		batch_sizes = file_sizes[start:start + batchsize]
+		for path, filesize, chunk_list in zip(batch_paths, batch_sizes,\
+			hash_files(batch_paths, chunk_func, jobs, backend, progress, batch_sizes)):
+			if chunk_list is not None:
+				chunk_index.add_file(path, filesize, chunk_list)
+	progress.close()
+	
+	if timer is not None:
+		timer.count('files', len(chunk_index.file_list))
+		timer.count('bytes_read', chunk_index.total_bytes)
+		timer.count('chunks', chunk_index.chunk_cnt)
+	return chunk_index
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+REPORT_HEADER = ['category', 'group', 'filesize', 'path']
+
+def get_group_filesize(group):
+	"""
+	Size of the first file in [group] that can still be stat-ed,
+	or None when all of them vanished since the scan.
+	"""
+	for path in group:
+		try:
+			return os.path.getsize(path)
+		except OSError:
+			continue
+	return None
+	
+
+def iter_report_rows(duplicate_group_list, hardlink_group_list=()):
+	"""
+	Yield one [category, group, filesize, path] report row per
+	duplicate file, then per hardlink alias.
+	"""
+	for category, group_list in (('duplicate', duplicate_group_list), ('hardlink', hardlink_group_list)):
+		for group_num, group in enumerate(group_list, start=1):
+			filesize = get_group_filesize(group)
+			for path in group:
+				yield [category, group_num, filesize, path]
+			
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def build_arg_list() -> list:
+	
+	arg_list = [
+			Parse_Arg(name='-Batch', default_value='n', is_required=False,\
+				help_text='y: no prompts, scan the -InclDirList roots. Exit status 0: no duplicates, 2: error, 3: duplicates found'),
+			Parse_Arg(name='-Pipeline', default_value='y', is_required=False,\
+				help_text='y: hash while the walk is still running'),
+			Parse_Arg(name='-ChunkSize', default_value=0, is_required=False,\
+				help_text='hash read size in bytes, 0 = adaptive', arg_type=int),
+			Parse_Arg(name='-HashIO', default_value='readinto', is_required=False,\
+				help_text='read, readinto or mmap'),
+			Parse_Arg(name='-HashAlgo', default_value='md5', is_required=False,\
+				help_text='hashlib algorithm or auto'),
+			Parse_Arg(name='-MinFileSize', default_value=1, is_required=False,\
+				help_text='smallest file size in bytes', arg_type=int),
+			Parse_Arg(name='-InclDirUserInput', default_value=False, is_required=False, help_text=''),
+			Parse_Arg(name='-InclDirList', default_value=[Parse_Arg.curdir], is_required=False,\
+				help_text='one or more root directories', nargs='+'),
+			Parse_Arg(name='-ExclDirList', default_value=[], is_required=False,\
+				help_text='directory names or paths to skip', nargs='*'),
+			Parse_Arg(name='-HashMode', default_value='full', is_required=False,\
+				help_text='full or staged'),
+			Parse_Arg(name='-SampleSize', default_value=4096, is_required=False,\
+				help_text='head/tail sample size for staged mode', arg_type=int),
+			Parse_Arg(name='-Jobs', default_value=1, is_required=False,\
+				help_text='hash workers', arg_type=int),
+			Parse_Arg(name='-JobBackend', default_value='thread', is_required=False,\
+				help_text='thread or process'),
+			Parse_Arg(name='-HashCache', default_value='auto', is_required=False,\
+				help_text='auto (in the user cache dir, not scanned), none or a sqlite path'),
+			Parse_Arg(name='-HashCacheMaxEntries', default_value=5000000, is_required=False,\
+				help_text='', arg_type=int),
+			Parse_Arg(name='-HashCachePrune', default_value='n', is_required=False,\
+				help_text='y: drop cache rows of missing files'),
+			Parse_Arg(name='-Incremental', default_value='none', is_required=False,\
+				help_text='auto (in the user cache dir, not scanned), none or a sqlite path for the directory snapshot'),
+			Parse_Arg(name='-IncrementalFullVerifyDays', default_value=7, is_required=False,\
+				help_text='', arg_type=float),
+			Parse_Arg(name='-LogFormat', default_value='text', is_required=False,\
+				help_text='text or jsonl'),
+			Parse_Arg(name='-LogRotateSize', default_value=0, is_required=False,\
+				help_text='rotate the log at this size in bytes, 0 = never', arg_type=int),
+			Parse_Arg(name='-LogCompress', default_value='n', is_required=False,\
+				help_text='y: gzip rotated logs'),
+			Parse_Arg(name='-ReportPath', default_value='', is_required=False,\
+				help_text='xlsx, csv or jsonl report file'),
+			Parse_Arg(name='-BlockAnalysis', default_value='n', is_required=False,\
+				help_text='y: also report content shared between files, by chunks'),
+			Parse_Arg(name='-ChunkAvgSize', default_value=65536, is_required=False,\
+				help_text='average chunk size in bytes, a power of two', arg_type=int),
+			Parse_Arg(name='-ChunkIndexMaxEntries', default_value=4000000, is_required=False,\
+				help_text='chunk digests kept before the index samples; file pairs are capped at a quarter of it', arg_type=int),
+			Parse_Arg(name='-BlockTopPairs', default_value=20, is_required=False,\
+				help_text='file pairs listed in the log', arg_type=int),
+			Parse_Arg(name='-BlockReportPath', default_value='', is_required=False,\
+				help_text='xlsx, csv or jsonl report of the file pairs; a chunk counts only toward pairs with its first 4 holders'),
+			Parse_Arg(name='-NearDupText', default_value='n', is_required=False,\
+				help_text='y: also group text files that differ by a few lines'),
+			Parse_Arg(name='-NearDupThreshold', default_value=0.8, is_required=False,\
+				help_text='estimated Jaccard similarity of the word shingles', arg_type=float),
+			Parse_Arg(name='-NearDupShingleSize', default_value=5, is_required=False,\
+				help_text='words per shingle', arg_type=int),
+			Parse_Arg(name='-NearDupNumPerm', default_value=128, is_required=False,\
+				help_text='MinHash functions per signature', arg_type=int),
+			Parse_Arg(name='-NearDupMaxFileSize', default_value=8 * 1024 * 1024, is_required=False,\
+				help_text='larger files are skipped', arg_type=int),
+			Parse_Arg(name='-NearDupReportPath', default_value='', is_required=False,\
+				help_text='xlsx, csv or jsonl report of the similar pairs'),
+			Parse_Arg(name='-TimingPath', default_value='', is_required=False,\
+				help_text='json file for the per-stage timing spans and counters')
+		]
+	
+	return arg_list
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+BLOCK_REPORT_HEADER = ['path_a', 'path_b', 'shared_bytes', 'shared_percent']
+
+def write_block_dedup(msgr, file_table, jobs=1, backend='thread', timer=None):
+	"""
+	Run the block-level dedup analysis on the scanned files, one
+	path per inode, and write the summary and the top file pairs.
+	"""
+	chunk_avg_size = Parse_Arg.get_arg_by_name('ChunkAvgSize')
+	if chunk_avg_size & (chunk_avg_size - 1):
+		chunk_avg_size = 1 << chunk_avg_size.bit_length()	# the cut mask needs a power of two
+	top_n = Parse_Arg.get_arg_by_name('BlockTopPairs')
+	
+	rows = file_table.unique_inodes()
+	msgr.write_msg(f'{LF}block analysis: {len(rows)} file(s), chunks of about {chunk_avg_size} bytes. . .{LF}')
+	with timer_span(timer, 'block analysis'):
+		chunk_index = analyze_block_dedup(file_table.get_paths(rows),\
+			[file_table.sizes[row] for row in rows], chunk_avg_size, jobs, backend,\
+			Parse_Arg.get_arg_by_name('ChunkIndexMaxEntries'), timer)
+			
+	msgr.write_msg(f'{LF} {chunk_index.as_str()}')
+	msgr.write_event('block_summary', files=len(chunk_index.file_list),\
+		total_bytes=chunk_index.total_bytes, dedupable_bytes=chunk_index.dedup_bytes,\
+		chunks=chunk_index.chunk_cnt, estimated=chunk_index.is_estimate(),\
+		pairs_pruned=chunk_index.pair_prune_cnt > 0, max_holders=Chunk_Index.MAX_HOLDERS)
+	msgr.write_msg(f'{LF} shared bytes are credited to the pairs with the first {Chunk_Index.MAX_HOLDERS} holder(s) of each chunk')
+	for path_a, path_b, shared_bytes, percent in chunk_index.iter_pairs(top_n):
+		msgr.write_msg(f'{LF} {shared_bytes:>14} bytes ({percent:5.1f}%) shared: {path_a} | {path_b}')
+		msgr.write_event('block_pair', path_a=path_a, path_b=path_b,\
+			shared_bytes=shared_bytes, shared_percent=percent)
+		
+	report_path = Parse_Arg.get_arg_by_name('BlockReportPath')
+	if report_path:
+		with Report_Writer(report_path, header=BLOCK_REPORT_HEADER) as rw:
+			row_cnt = rw.write_rows(list(pair) for pair in chunk_index.iter_pairs())
+		msgr.write_msg(f'{LF}{row_cnt} block report row(s) written to {report_path}')
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+NEAR_DUP_REPORT_HEADER = ['group', 'path_a', 'path_b', 'similarity']
+
+def write_near_dup_text(msgr, file_table, jobs=1, backend='thread', timer=None):
+	"""
+	Find groups of near-duplicate text files among the scanned
+	files, one path per inode, with MinHash signatures and LSH.
+	Binary files and files over -NearDupMaxFileSize are skipped.
+	"""
+	threshold = Parse_Arg.get_arg_by_name('NearDupThreshold')
+	num_perm = Parse_Arg.get_arg_by_name('NearDupNumPerm')
+	max_size = Parse_Arg.get_arg_by_name('NearDupMaxFileSize')
+	minhash_func = functools.partial(get_text_file_minhash, num_perm=num_perm,\
+		shingle_size=Parse_Arg.get_arg_by_name('NearDupShingleSize'), max_size=max_size)
+		
+	rows = [row for row in file_table.unique_inodes() if file_table.sizes[row] <= max_size]
+	paths = file_table.get_paths(rows)
+	file_sizes = [file_table.sizes[row] for row in rows]
+	msgr.write_msg(f'{LF}near-duplicate text: {len(paths)} file(s), threshold {threshold}. . .{LF}')
+	
+	with timer_span(timer, 'near-dup text'):
+		text_index = MinHash_Index(num_perm, threshold)
+		progress = ProgressBar(len(paths), fmt=ProgressBar.BYTES, total_bytes=sum(file_sizes))
+		signatures = hash_files(paths, minhash_func, jobs, backend, progress, file_sizes)
+		progress.close()
+		for path, signature in zip(paths, signatures):
+			if signature is not None:
+				text_index.add(path, signature)
+		pair_list = sorted(text_index.iter_similar_pairs(), key=lambda pair: (-pair[2], pair[0], pair[1]))
+		group_list = MinHash_Index.get_clusters(pair_list)
+		if timer is not None:
+			timer.count('files', len(paths))
+			timer.count('texts', len(text_index.path_list))
+			# a binary file is read no further than its head
+			timer.count('bytes_read', sum(filesize if signature is not None\
+				else min(filesize, TEXT_SNIFF_SIZE) for filesize, signature in zip(file_sizes, signatures)))
+			timer.count('similar_pairs', len(pair_list))
+			
+	msgr.write_msg(f'{LF} {text_index.as_str()}')
+	msgr.write_msg(f'{LF}{len(group_list)} Near-Duplicate Text Group(s) Found')
+	group_num_dict = {}
+	for group_num, group in enumerate(group_list, start=1):
+		msgr.write_msg(f'{LF} {"-" * 60}')
+		msgr.write_msg(f'{LF}Near-Duplicate')
+		for path in group:
+			group_num_dict[path] = group_num
+			msgr.write_msg(f'{LF} {path}')
+		msgr.write_msg(f'{LF} {"-" * 60}')
+		msgr.write_event('near_dup_group', paths=group)
+		
+	report_path = Parse_Arg.get_arg_by_name('NearDupReportPath')
+	if report_path:
+		with Report_Writer(report_path, header=NEAR_DUP_REPORT_HEADER) as rw:
+			row_cnt = rw.write_rows([group_num_dict[path_a], path_a, path_b, similarity]\
+				for path_a, path_b, similarity in pair_list)
+		msgr.write_msg(f'{LF}{row_cnt} near-duplicate report row(s) written to {report_path}')
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_scan_roots(root_list) -> list:
+	"""
+	Resolve the root directories and drop repeats and roots nested
+	inside another root, so no file is walked twice.
+	"""
+	_root_list = []
+	for root in sorted(set(os.path.realpath(root) for root in root_list), key=lambda root: pathlib.Path(root).parts):
+		if any(os.path.commonpath([kept, root]) == kept for kept in _root_list):
+			continue
+		_root_list.append(root)
+	return _root_list
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+# 1 is left out: Python exits with 1 on an uncaught exception
+EXIT_OK = 0
+EXIT_ERROR = 2
+EXIT_DUPLICATES_FOUND = 3
+
+def dupl_main(msgr, timer=None):
+	"""
+	Scan the selected roots and return (duplicate groups, hardlink
+	groups), or None when a root is not a directory.
+	
+	With -Batch y there are no prompts and the -InclDirList roots
+	are scanned as given. Stages are timed as spans of [timer].
+	"""
+	
+	#pargs = Parse_Arg.get_parsed_args()
+	#msgr.write_msg(f'{LF} {pargs}')
+	
+	chunksize = Parse_Arg.get_arg_by_name('ChunkSize')
+	msgr.write_msg(f'{LF}chunksize: {chunksize if chunksize > 0 else "adaptive"}')
+	io_backend = Parse_Arg.get_arg_by_name('HashIO')
+	msgr.write_msg(f'{LF}hash io: {io_backend}')
+	
+	algo = Parse_Arg.get_arg_by_name('HashAlgo')
+	if algo == 'auto':
+		probe_list = probe_hash_algos()
+		for probe_algo, mb_per_sec in probe_list:
+			msgr.write_msg(f'{LF}hash probe: {probe_algo} {mb_per_sec:.1f} MB/s')
+		algo = probe_list[0][0]
+	get_hash_object(algo)	# fail early on an unknown algorithm
+	msgr.write_msg(f'{LF}hash algo: {algo}')
+	
+	min_file_size = Parse_Arg.get_arg_by_name('MinFileSize')
+	excl_dir_list = Parse_Arg.get_arg_by_name('ExclDirList')
+	if isinstance(excl_dir_list, str):
+		excl_dir_list = [excl_dir_list]
 	
+	samplesize = 0
+	if Parse_Arg.get_arg_by_name('HashMode') == 'staged':
+		samplesize = Parse_Arg.get_arg_by_name('SampleSize')
+	msgr.write_msg(f'{LF}samplesize: {samplesize}')
 	
+	jobs = Parse_Arg.get_arg_by_name('Jobs')
+	backend = Parse_Arg.get_arg_by_name('JobBackend')
+	msgr.write_msg(f'{LF}jobs: {jobs} ({backend})')
 	
+	# 'auto' databases live in the user cache dir, which the walk skips, so
+	# the scan never reads its own cache files while they change
+	excl_dir_list = list(excl_dir_list or [])
+	cache = None
+	cache_path = Parse_Arg.get_arg_by_name('HashCache')
+	if cache_path == 'auto':
+		cache_dir = get_user_cache_dir()
+		cache_path = os.path.join(cache_dir, 'hashcache.sqlite3')
+		excl_dir_list.append(os.path.realpath(cache_dir))
+	if cache_path != 'none':
+		cache_max_entries = Parse_Arg.get_arg_by_name('HashCacheMaxEntries')
+		cache = Hash_Cache(cache_path, max_entries=cache_max_entries)
+		msgr.write_msg(f'{LF}hash cache: {cache_path}')
+		
+	# unchanged directories are reused from the snapshot of the last scan
+	snapshot = None
+	snapshot_path = Parse_Arg.get_arg_by_name('Incremental')
+	if snapshot_path == 'auto':
+		cache_dir = get_user_cache_dir()
+		snapshot_path = os.path.join(cache_dir, 'snapshot.sqlite3')
+		if os.path.realpath(cache_dir) not in excl_dir_list:
+			excl_dir_list.append(os.path.realpath(cache_dir))
+	if snapshot_path != 'none':
+		full_verify_days = Parse_Arg.get_arg_by_name('IncrementalFullVerifyDays')
+		snapshot = Dir_Snapshot(snapshot_path, full_verify_days=full_verify_days)
+		msgr.write_msg(f'{LF}dir snapshot: {snapshot_path}')
 	
+	root_list = Parse_Arg.get_arg_by_name('InclDirList')
+	if isinstance(root_list, str):
+		root_list = [root_list]
+		
+	if str(Parse_Arg.get_arg_by_name('Batch')).lower() != 'y':
+		yn = 'n'
+		yn = str(input(f'{LF}Use {", ".join(root_list)} as selected directory? [Y/N]:')).lower()
+		if yn != 'y':
+			root_list = [select_dir()]
+			
+	missing_list = [root for root in root_list if not os.path.isdir(root)]
+	if missing_list:
+		for root in missing_list:
+			msgr.write_msg(f'{LF}not a directory: {root}')
+		return None
+	root_list = get_scan_roots(root_list)
+		
+	msgr.write_msg(f'{LF}Scanning for duplicate files...{LF}{LF}')
+	msgr.write_event('scan_start', roots=root_list, hash_algo=algo,\
+		args=Parse_Arg.arg_parsed_dict)
+		
+	if str(Parse_Arg.get_arg_by_name('Pipeline')).lower() == 'y':
+		selected_files, duplicate_candidates = find_duplicate_files_pipelined(root_list,\
+			excl_dir_list, min_file_size, chunksize, msgr=msgr, samplesize=samplesize,\
+			jobs=jobs, backend=backend, cache=cache, io_backend=io_backend, algo=algo,\
+			snapshot=snapshot, timer=timer)
+		if snapshot is not None:
+			snapshot.close()
+			msgr.write_msg(f'{LF} {snapshot.as_str()}')
+	else:
+		# one table for all roots, so files are sized and hashed across roots
+		file_table = FileTable()
+		with timer_span(timer, 'walk'):
+			for root in root_list:
+				row_cnt = file_table.extend_walk(root, excl_dir_list=excl_dir_list, snapshot=snapshot)
+				msgr.write_msg(f'{LF}{root}: {row_cnt} file(s)')
+			if timer is not None:
+				timer.count('files', len(file_table))
+				timer.count('stat_calls', len(file_table) if snapshot is None else snapshot.stat_cnt)
+		if snapshot is not None:
+			snapshot.close()
+			msgr.write_msg(f'{LF} {snapshot.as_str()}')
+		selected_files = file_table.take(file_table.filter_size(min_file_size))
+		
+		duplicate_candidates = find_duplicate_files(selected_files, chunksize,\
+			msgr=msgr, samplesize=samplesize,\
+			jobs=jobs, backend=backend, cache=cache, io_backend=io_backend, algo=algo,\
+			timer=timer)
+	hardlink_group_list = group_hardlinks(selected_files)
+	
+	duplicate_group_list = []
+	if duplicate_candidates:
+		start_time = time.perf_counter()
+		with timer_span(timer, 'verify'):
+			for group in duplicate_candidates:
+				duplicate_group_list.extend(verify_duplicate_group(group, timer=timer))
+		write_stage_msg(msgr, 'verify', sum(len(group) for group in duplicate_candidates),\
+			sum(len(group) for group in duplicate_group_list), time.perf_counter() - start_time)
+	
+	if str(Parse_Arg.get_arg_by_name('BlockAnalysis')).lower() == 'y':
+		write_block_dedup(msgr, selected_files, jobs, backend, timer)
+		
+	if str(Parse_Arg.get_arg_by_name('NearDupText')).lower() == 'y':
+		write_near_dup_text(msgr, selected_files, jobs, backend, timer)
+	
+	if cache is not None:
+		if str(Parse_Arg.get_arg_by_name('HashCachePrune')).lower() == 'y':
+			cache.prune()
+		cache.close()
+		msgr.write_msg(f'{LF} {cache.as_str()}')
+		
+	msgr.write_msg(f'{LF}Scanning complete.')
+	
+	return duplicate_group_list, hardlink_group_list
+
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def run_main(msgr, program_path) -> int:
+	"""
+	Scan, report and time one run; returns the exit status.
+	"""
 	timer = MY_Timer()
 	
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
 	
-	duplicate_pair_list = dupl_main(msgr)
+	scan_result = dupl_main(msgr, timer)
+	if scan_result is None:
+		return EXIT_ERROR
+	duplicate_group_list, hardlink_group_list = scan_result
 	
-	duplicate_count = len(duplicate_pair_list)
+	duplicate_count = len(duplicate_group_list)
 	if duplicate_count > 0:
-		msgr.write_msg(f'{LF}{duplicate_count} Duplicate(s) Found')
-		for file1, file2 in duplicate_pair_list:
+		msgr.write_msg(f'{LF}{duplicate_count} Duplicate Group(s) Found')
+		for group in duplicate_group_list:
 			msgr.write_msg(f'{LF} {"-" * 60}')
 			msgr.write_msg(f'{LF}Duplicate')
-			msgr.write_msg(f'{LF} {file1}')
-			msgr.write_msg(f'{LF} {file2}')
+			for path in group:
+				msgr.write_msg(f'{LF} {path}')
 			msgr.write_msg(f'{LF} {"-" * 60}')
+			msgr.write_event('duplicate_group', filesize=get_group_filesize(group), paths=group)
 	else:
 		msgr.write_msg(LF)
 		msgr.write_msg('No duplicates found')
+		
+	if hardlink_group_list:
+		msgr.write_msg(f'{LF}{len(hardlink_group_list)} Hardlink Group(s) Found')
+		for group in hardlink_group_list:
+			msgr.write_msg(f'{LF} {"-" * 60}')
+			msgr.write_msg(f'{LF}Hardlink')
+			for path in group:
+				msgr.write_msg(f'{LF} {path}')
+			msgr.write_msg(f'{LF} {"-" * 60}')
+			msgr.write_event('hardlink_group', filesize=get_group_filesize(group), paths=group)
+	
+	report_path = Parse_Arg.get_arg_by_name('ReportPath')
+	if report_path:
+		with timer_span(timer, 'report'), Report_Writer(report_path, header=REPORT_HEADER) as rw:
+			row_cnt = rw.write_rows(iter_report_rows(duplicate_group_list, hardlink_group_list))
+		msgr.write_msg(f'{LF}{row_cnt} report row(s) written to {report_path}')
 	
 	#-------------------------------------------------------------
 	# 
@@ -271,18 +1930,65 @@ def main():
 	
 	timer.calc_elapsed()
 	
+	msgr.write_event('summary', duplicate_groups=duplicate_count,\
+		duplicate_files=sum(len(group) for group in duplicate_group_list),\
+		hardlink_groups=len(hardlink_group_list),\
+		elapsed_seconds=timer.elapsed.total_seconds())
+	
+	msgr.write_msg(f'{LF}{timer.as_table()}')
+	msgr.write_event('timing', **timer.as_dict())
+	timing_path = Parse_Arg.get_arg_by_name('TimingPath')
+	if timing_path:
+		timer.dump_json(timing_path)
 	msgr.write_msg(f'{LF} {timer.as_str()}')
 	
 	msgr.write_msg(LF)
 	msgr.write_msg(f'{LF}program {program_path} completed. {LF}')
 	
-	msgr.close_writer()
+	return EXIT_DUPLICATES_FOUND if duplicate_count > 0 else EXIT_OK
 	
-	Message_Writer.shutdown()
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def main():
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	program_path = __file__
+	fileprefix = str(pathlib.Path(program_path).stem)
+	
+	Parse_Arg.setup(build_arg_list())
+	
+	Message_Writer.setup()
+	
+	msgr = Message_Writer(name='root',prefix=fileprefix,async_flush=True,\
+		log_format=Parse_Arg.get_arg_by_name('LogFormat'),\
+		rotate_size=Parse_Arg.get_arg_by_name('LogRotateSize'),\
+		compress_rotated=(str(Parse_Arg.get_arg_by_name('LogCompress')).lower() == 'y'))
+	
+	msgr.write_msg(f'{LF}program {program_path} started. {LF}')
+	
+	
+	
+	
+	exit_code = EXIT_ERROR
+	try:
+		exit_code = run_main(msgr, program_path)
+	except Exception:
+		msgr.write_msg(f'{LF}{traceback.format_exc()}')
+	finally:
+		if exit_code == EXIT_ERROR:
+			msgr.write_msg(f'{LF}program {program_path} failed. {LF}')
+		msgr.close_writer()
+		Message_Writer.shutdown()
+		
+	return exit_code
 	
 
 if __name__ == "__main__":
-	main()
+	sys.exit(main())
 	
 	
 	
@@ -2,7 +2,7 @@
 # 
 #---------------------------------------------------------------------
 
-__all__ = ['build_file_list','list_to_xlsx','select_from_list','LF','clsFileNode','Message_Writer','get_text_from_file','ProgressBar']
+__all__ = ['build_file_list','walk_files','get_nested_roots','Dir_Snapshot','list_to_xlsx','Report_Writer','select_from_list','LF','clsFileNode','clsFileNodeLite','FileNode_Index','FileTable','Message_Writer','read_log_records','get_text_from_file','ProgressBar','MY_Timer','timer_span','get_text_shingles','get_minhash_signature','get_text_file_minhash','MinHash_Index','get_trigrams','get_regex_literals','Trigram_Index','compile_search_patterns','search_file_mmap','search_files']
 
 #---------------------------------------------------------------------
 # 
@@ -32,9 +32,32 @@ Required modules:
 import pathlib
 import datetime
 import io
+import os
+import stat
 import sys
+import fnmatch
+import contextlib
+import functools
+import array
+import threading
+import json
+import gzip
+import shutil
+import csv
+import sqlite3
+import random
+import mmap
+import itertools
+import collections
+import concurrent.futures
+import zlib
 import openpyxl
 
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
 from operator import attrgetter
 import mimetypes
 import time
@@ -49,16 +72,136 @@ LF = '\n'
 #-------------------------------------------------------------
 
 class MY_Timer:
-	def __init__(self, starting_time=time.time(), timer_label='Elapsed Time: '):
+	"""
+	Wall clock timer for a whole run, with optional named spans.
+	
+	span(name) times a with block; a span opened inside another is
+	recorded as 'outer/inner'. timed(name) does the same for a
+	function. count(name, n) adds to a counter of the innermost
+	open span of the calling thread, or of an explicit [span] path,
+	e.g. from worker threads.
+	
+	A span costs two perf_counter calls and a locked dict update,
+	so spans can stay on in production; use them per stage or per
+	batch, not per chunk.
+	"""
+	def __init__(self, starting_time=None, timer_label='Elapsed Time: '):
+		if starting_time is None:
+			starting_time = time.time()
 		self.starting_time = starting_time
 		self.ending_time = starting_time
 		self.elapsed = 0
 		self.timer_label = timer_label
+		
+		self.span_dict = {}
+		self._span_lock = threading.Lock()
+		self._local = threading.local()
 	
 	def calc_elapsed(self):
 		self.ending_time = time.time()
 		self.elapsed = timedelta(seconds=self.ending_time - self.starting_time)
 		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _get_stack(self) -> list:
+		stack = getattr(self._local, 'stack', None)
+		if stack is None:
+			stack = self._local.stack = []
+		return stack
+		
+	def _get_span(self, path) -> dict:
+		span = self.span_dict.get(path)
+		if span is None:
+			span = self.span_dict[path] = {'calls': 0, 'seconds': 0.0, 'counters': {}}
+		return span
+		
+	@contextlib.contextmanager
+	def span(self, name):
+		"""
+		Time a with block as span [name], nested under the open span
+		of the calling thread. Yields the span path.
+		"""
+		stack = self._get_stack()
+		path = f'{stack[-1]}/{name}' if stack else name
+		with self._span_lock:
+			self._get_span(path)	# keep spans in the order they first open
+		stack.append(path)
+		start_time = time.perf_counter()
+		try:
+			yield path
+		finally:
+			elapsed = time.perf_counter() - start_time
+			stack.pop()
+			with self._span_lock:
+				span = self.span_dict[path]
+				span['calls'] += 1
+				span['seconds'] += elapsed
+				
+	def timed(self, name=None):
+		"""
+		Decorator, runs the function inside span [name] (default:
+		the function name).
+		"""
+		def decorator(func):
+			_name = name or func.__name__
+			@functools.wraps(func)
+			def wrapper(*args, **kwargs):
+				with self.span(_name):
+					return func(*args, **kwargs)
+			return wrapper
+		return decorator
+		
+	def count(self, name, n=1, span=None):
+		if span is None:
+			stack = self._get_stack()
+			span = stack[-1] if stack else ''
+		with self._span_lock:
+			counters = self._get_span(span)['counters']
+			counters[name] = counters.get(name, 0) + n
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def get_elapsed_seconds(self) -> float:
+		if isinstance(self.elapsed, timedelta):
+			return self.elapsed.total_seconds()
+		return time.time() - self.starting_time
+		
+	def as_dict(self) -> dict:
+		span_list = []
+		for path, span in self.span_dict.items():
+			span_list.append({'span': path, 'calls': span['calls'],\
+				'seconds': span['seconds'], **span['counters']})
+		return {'elapsed_seconds': self.get_elapsed_seconds(), 'spans': span_list}
+		
+	def as_table(self) -> str:
+		"""
+		Return the spans as a text table, children indented below
+		their parent, with the share of the total run time.
+		"""
+		total_seconds = self.get_elapsed_seconds()
+		_msg = f'{LF}{"span":<32} {"calls":>7} {"seconds":>10} {"%":>6}  counters'
+		for path, span in self.span_dict.items():
+			if path:
+				name = '  ' * path.count('/') + path.rsplit('/', 1)[-1]
+			else:
+				name = '(no span)'
+			percent = 100.0 * span['seconds'] / total_seconds if total_seconds > 0 else 0.0
+			counters = ' '.join(f'{k}={v}' for k, v in span['counters'].items())
+			_msg += f'{LF}{name:<32} {span["calls"]:>7} {span["seconds"]:>10.3f} {percent:>6.1f}  {counters}'
+		return _msg
+		
+	def dump_json(self, json_path):
+		with open(json_path, 'w', encoding='utf-8') as f:
+			json.dump(self.as_dict(), f, indent=1)
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
 	def as_str(self) -> str:
 		_msg = f'{LF}<{self.__class__.__name__}> {self.timer_label} elapsed: {self.elapsed}'
 		return _msg
@@ -70,6 +213,18 @@ class MY_Timer:
 # 
 #-------------------------------------------------------------
 
+def timer_span(timer, name):
+	"""
+	timer.span(name), or a no-op context when [timer] is None.
+	"""
+	if timer is None:
+		return contextlib.nullcontext()
+	return timer.span(name)
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
 class ProgressBar(object):
 	#
 	# https://stackoverflow.com/questions/3160699/python-progress-bar
@@ -85,16 +240,25 @@ class ProgressBar(object):
 	#
 	# progress.close()
 	#
+	# Byte mode: pass total_bytes, call progress(nbytes) per step
+	# and use fmt=ProgressBar.BYTES for MB/s and ETA.
+	#
+	# Redraws are throttled to one per min_interval seconds. When
+	# output is not a TTY (cron, pipes) nothing is drawn, unless
+	# enabled=True is passed.
+	#
 		
 	DEFAULT = 'Progress: %(bar)s %(percent)3d%%'
 	FULL = '%(bar)s %(current)d/%(total)d (%(percent)3d%%)'
+	BYTES = '%(bar)s %(current_mb).1f/%(total_mb).1f MB (%(percent)3d%%) %(mb_per_sec).1f MB/s ETA %(eta)s'
 	
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
 	
 	def __init__(self, total, width=40, fmt=DEFAULT, symbol=chr(9632),\
-		output=sys.stdout,interval_length=1,label=''):
+		output=sys.stdout,interval_length=1,label='',min_interval=0.1,\
+		total_bytes=None,enabled=None):
 			self.total = total
 			self.width = width
 			self.symbol = symbol
@@ -106,6 +270,18 @@ class ProgressBar(object):
 			self.interval_length = interval_length
 			self.interval_count = 0
 			
+			self.total_bytes = total_bytes
+			self.current_bytes = 0
+			
+			self.min_interval = min_interval
+			self.start_time = time.monotonic()
+			self.last_render_time = 0.0
+			
+			if enabled is None:
+				_isatty = getattr(output, 'isatty', None)
+				enabled = bool(_isatty is not None and _isatty())
+			self.is_enabled = enabled
+			
 			self.is_done=False
 			
 	#-------------------------------------------------------------
@@ -115,12 +291,23 @@ class ProgressBar(object):
 	def _update(self):
 		
 		if self.current >= self.total:
-			percent = 1.0
 			self.current = self.total
+			
+		if self.total_bytes:
+			percent = min(self.current_bytes / float(self.total_bytes), 1.0)
+		elif self.current >= self.total:
+			percent = 1.0
 		else:
 			percent = self.current / float(self.total)
 		size = int(self.width * percent)
 		remaining = self.total - self.current
+		
+		elapsed = max(time.monotonic() - self.start_time, 1e-9)
+		bytes_per_sec = self.current_bytes / elapsed
+		eta = '--:--:--'
+		if self.total_bytes and bytes_per_sec > 0:
+			_remaining_bytes = max(self.total_bytes - self.current_bytes, 0)
+			eta = str(timedelta(seconds=int(_remaining_bytes / bytes_per_sec)))
 	
 		bar = '[' + self.symbol * size + ' ' * (self.width - size) + ']'
 		args = {
@@ -128,7 +315,11 @@ class ProgressBar(object):
 			'bar': bar,
 			'current': self.current,
 			'percent': percent * 100,
-			'remaining': remaining
+			'remaining': remaining,
+			'current_mb': self.current_bytes / 1e6,
+			'total_mb': (self.total_bytes or 0) / 1e6,
+			'mb_per_sec': bytes_per_sec / 1e6,
+			'eta': eta
 		}
 		
 		print('\r' + self.fmt % args, file=self.output, end='')
@@ -137,15 +328,27 @@ class ProgressBar(object):
 	# 
 	#-------------------------------------------------------------
 	
-	def __call__(self):
+	def __call__(self, nbytes=0):
 		
-		if not self.is_done:
-			if self.interval_count >= self.interval_length:
-				self.interval_count = 0
-			else:
-				self.current += 1
-				self.interval_count += 1
-			self._update()
+		if self.is_done:
+			return
+			
+		self.current += 1
+		self.current_bytes += nbytes
+		
+		if not self.is_enabled:
+			return
+			
+		self.interval_count += 1
+		if self.interval_count < self.interval_length:
+			return
+		self.interval_count = 0
+		
+		_now = time.monotonic()
+		if (_now - self.last_render_time) < self.min_interval:
+			return
+		self.last_render_time = _now
+		self._update()
 			
 	#-------------------------------------------------------------
 	# 
@@ -154,9 +357,11 @@ class ProgressBar(object):
 	def close(self):
 		if not self.is_done:
 			self.current = self.total
-			self.interval_length=1
-			self()
-			print('', file=self.output)
+			if self.total_bytes:
+				self.current_bytes = max(self.current_bytes, self.total_bytes)
+			if self.is_enabled:
+				self._update()
+				print('', file=self.output)
 			self.is_done = True
 		
 
@@ -164,15 +369,97 @@ class ProgressBar(object):
 # 
 #-------------------------------------------------------------
 
+class FileNode_Index:
+	"""
+	Path-keyed registry of file nodes, with secondary indexes
+	by parent directory and by file type.
+	
+	Insert, lookup and removal are O(1). Registering a node for a
+	path that is already indexed replaces the earlier node.
+	"""
+	
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def __init__(self):
+		self.node_dict = {}
+		self.parentdir_dict = {}	# parentdir -> {path: node}
+		self.filetype_dict = {}		# filetype -> {path: node}
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def add(self, node):
+		if node.path in self.node_dict:
+			self.remove(node.path)
+		self.node_dict[node.path] = node
+		self.parentdir_dict.setdefault(node.parentdir, {})[node.path] = node
+		self.filetype_dict.setdefault(node.filetype, {})[node.path] = node
+		
+	def remove(self, path):
+		node = self.node_dict.pop(path, None)
+		if node is not None:
+			for _dict, _key in ((self.parentdir_dict, node.parentdir),\
+				(self.filetype_dict, node.filetype)):
+				_nodes = _dict[_key]
+				del _nodes[path]
+				if not _nodes:
+					del _dict[_key]
+		return node
+		
+	def clear(self):
+		self.node_dict.clear()
+		self.parentdir_dict.clear()
+		self.filetype_dict.clear()
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def get(self, path):
+		return self.node_dict.get(path)
+		
+	def get_by_parentdir(self, parentdir) -> list:
+		return list(self.parentdir_dict.get(parentdir, {}).values())
+		
+	def get_by_filetype(self, filetype) -> list:
+		return list(self.filetype_dict.get(filetype, {}).values())
+		
+	def dirs(self):
+		return self.parentdir_dict.keys()
+		
+	def filetypes(self):
+		return self.filetype_dict.keys()
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def __contains__(self, path) -> bool:
+		return path in self.node_dict
+		
+	def __iter__(self):
+		return iter(self.node_dict.values())
+		
+	def __len__(self) -> int:
+		return len(self.node_dict)
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
 class clsFileNode:
 	"""
 	Models file attributes and behavior.
+	
+	Nodes register themselves in clsFileNode.index, a FileNode_Index.
+	Use reset_index() or scoped_index() to bound the registry in
+	long-lived processes.
 	"""
 
-	dir_set = set()
-	filetype_set = set()
-	
-	filenode_list = []
+	index = FileNode_Index()
 	sorted_filenode_list = []
 	
 	#-------------------------------------------------------------
@@ -234,14 +521,9 @@ class clsFileNode:
 		#self.is_dupe_candidate = False
 		#self.is_dupe = False
 		
-		_cls.dir_set.add(self.parentdir)
-		_cls.filetype_set.add(self.filetype)
-			
 		self.text_content = ''
 		
-		if self not in clsFileNode.filenode_list:
-			_cls.filenode_list.append(self)
-			_cls.sorted_filenode_list.append(self)
+		_cls.index.add(self)
 			
 	#-------------------------------------------------------------
 	# 
@@ -274,7 +556,7 @@ class clsFileNode:
 	
 	@classmethod
 	def sort_nodes(cls,sort_reversed=False):
-		_filenodes = cls.filenode_list
+		_filenodes = cls.index
 		cls.sorted_filenode_list = sorted(_filenodes,key=attrgetter('sortkey'),reverse=sort_reversed)
 		
 	#-------------------------------------------------------------
@@ -283,323 +565,2183 @@ class clsFileNode:
 	
 	@classmethod
 	def get_filenode_from_path(cls,path):
-		retnode = None
+		return cls.index.get(path)
 		
-		_ret_node_list = [fn for fn in cls.filenode_list if fn.path == path]
-		if len(_ret_node_list) == 1:
-			retnode = _ret_node_list[0]
-			
-		return retnode
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	@classmethod
+	def reset_index(cls):
+		"""
+		Drop all registered nodes.
+		"""
+		cls.index = FileNode_Index()
+		cls.sorted_filenode_list = []
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	@classmethod
+	@contextlib.contextmanager
+	def scoped_index(cls):
+		"""
+		Register nodes in a fresh index for the duration of a with
+		block, then restore the previous index. Yields the new index.
+		"""
+		_saved = (cls.index, cls.sorted_filenode_list)
+		cls.reset_index()
+		try:
+			yield cls.index
+		finally:
+			cls.index, cls.sorted_filenode_list = _saved
 			
 #-------------------------------------------------------------
 # 
 #-------------------------------------------------------------
 
-
-class Message_Writer:
+class clsFileNodeLite:
 	"""
-	Output Messages to File.
+	Compact file node built from an existing stat_result.
+	
+	Only the path and stat_result are stored at construction.
+	Derived attributes are computed on first access and cached in
+	__slots__; nodes are not added to the clsFileNode registry.
 	"""
 	
-	node_list = []
+	__slots__ = ('path', 'stat', '_parents', '_parentdir', '_filename',\
+		'_ext', '_filetype', '_is_symlink', '_dt_created', '_dt_modified',\
+		'_dt_accessed', 'sortkey')
 	
-	PRN_SCREEN_AND_FILE = 1
-	PRN_SCREEN_ONLY = 2
-	PRN_FILE_ONLY = 3
-	PRN_FLUSH_LOG_THRESHOLD = 100
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
+	def __init__(self, path, stat_result=None):
+		self.path = path
+		if stat_result is None:
+			stat_result = os.stat(path)
+		self.stat = stat_result
+		self.sortkey = path
+		
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
 	
-	def __new__(cls, name, prefix, prn_flag=1):
-		return super().__new__(cls)
+	@classmethod
+	def from_stat(cls, path, stat_result):
+		return cls(path, stat_result)
 		
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
 	
-	def __init__(self, name, prefix, prn_flag=1):
+	@property
+	def filesize(self) -> int:
+		return self.stat.st_size
 		
-		_cls = Message_Writer
+	@property
+	def is_hardlink(self) -> bool:
+		return self.stat.st_nlink > 1
 		
-		self.is_active = False
-		self.name = name
-		self.prn_flag = prn_flag
-		self.msg_cnt = 0
+	@property
+	def is_in_trash(self) -> bool:
+		return (self.path.find('.Trash') > 0)
+		
+	@property
+	def drive(self) -> str:
+		return os.path.splitdrive(self.path)[0]
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	@property
+	def parents(self) -> list:
+		try:
+			return self._parents
+		except AttributeError:
+			self._parents = list(pathlib.Path(self.path).parents)
+			return self._parents
 			
-		self.msgfilepath = _cls.get_output_path_with_dt(prefix)
+	@property
+	def parentdir(self) -> str:
+		try:
+			return self._parentdir
+		except AttributeError:
+			self._parentdir = os.path.dirname(self.path)
+			return self._parentdir
 			
-		self.msgbuf = io.StringIO()
+	@property
+	def filename(self) -> str:
+		try:
+			return self._filename
+		except AttributeError:
+			self._filename = os.path.basename(self.path)
+			return self._filename
 			
-		if self not in _cls.node_list:
-			_cls.node_list.append(self)
-			msg = f'\nmessage writer [{self.name}] starting. . .\n'
-			with open(self.msgfilepath,'w',encoding='utf-8') as f:
-				f.write('')
-				self.write_msg(msg)
-		else:
-			raise Exception ('message writer already established')
+	@property
+	def ext(self) -> str:
+		try:
+			return self._ext
+		except AttributeError:
+			self._ext = str(pathlib.PurePath(self.filename).suffix)
+			return self._ext
 			
-		self.is_active = True
+	@property
+	def filetype(self) -> str:
+		try:
+			return self._filetype
+		except AttributeError:
+			self._filetype = mimetypes.types_map.get(self.ext, '')
+			return self._filetype
+			
+	@property
+	def is_symlink(self) -> bool:
+		try:
+			return self._is_symlink
+		except AttributeError:
+			if stat.S_ISLNK(self.stat.st_mode):
+				self._is_symlink = True
+			else:
+				self._is_symlink = os.path.islink(self.path)
+			return self._is_symlink
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	# whole seconds, as clsFileNode gets from its ctime round-trip
+	
+	@property
+	def dt_created(self) -> datetime.datetime:
+		try:
+			return self._dt_created
+		except AttributeError:
+			self._dt_created = datetime.datetime.fromtimestamp(int(self.stat.st_ctime))
+			return self._dt_created
+			
+	@property
+	def dt_modified(self) -> datetime.datetime:
+		try:
+			return self._dt_modified
+		except AttributeError:
+			self._dt_modified = datetime.datetime.fromtimestamp(int(self.stat.st_mtime))
+			return self._dt_modified
+			
+	@property
+	def dt_accessed(self) -> datetime.datetime:
+		try:
+			return self._dt_accessed
+		except AttributeError:
+			self._dt_accessed = datetime.datetime.fromtimestamp(int(self.stat.st_atime))
+			return self._dt_accessed
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+			
+	def as_dict(self) -> dict:
+		d = {}
+		d['path'] = self.path
+		d['filesize'] = self.filesize
+		d['filetype'] = self.filetype
+		d['is_symlink'] = self.is_symlink
+		d['is_hardlink'] = self.is_hardlink
+		d['is_in_trash'] = self.is_in_trash
+		return d
+		
+	def __repr__(self) -> str:
+		return f'<{self.__class__.__name__}> {self.path}'
 		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+class FileTable:
+	"""
+	Columnar table of scanned files.
+	
+	Paths are stored back to back in one encoded byte block with an
+	offsets array. Sizes, mtimes (ns), inode, device and link counts
+	are typed arrays, and digests a fixed-width byte block. Selections
+	of rows are passed around as array('Q') row indexes. NumPy is used
+	for the vectorized operations when it is installed.
+	"""
+	
+	_fs_encoding = sys.getfilesystemencoding()
+	_fs_errors = sys.getfilesystemencodeerrors()
+	
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
 	
-	@staticmethod
-	def get_output_path_with_dt(prefix='msgr', ext='.log',\
-		_timefmt='%Y%m%d_%H%m%S%f'):
-		_path = ''.join([prefix, '_', datetime.datetime.now().strftime(_timefmt), ext])
-		return _path
+	def __init__(self):
+		self.path_block = bytearray()
+		self.path_offsets = array.array('Q', [0])
+		self.sizes = array.array('q')
+		self.mtimes = array.array('q')
+		self.inodes = array.array('Q')
+		self.devices = array.array('Q')
+		self.nlinks = array.array('Q')
+		self.digest_size = 0
+		self.digest_block = bytearray()
+		self.digest_flags = bytearray()
+		self.walked_roots = []
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
+	def append(self, path, stat_result):
+		_cls = FileTable
+		self.path_block += path.encode(_cls._fs_encoding, _cls._fs_errors)
+		self.path_offsets.append(len(self.path_block))
+		self.sizes.append(stat_result.st_size)
+		self.mtimes.append(stat_result.st_mtime_ns)
+		self.inodes.append(stat_result.st_ino)
+		self.devices.append(stat_result.st_dev)
+		self.nlinks.append(stat_result.st_nlink)
+		self.digest_flags.append(0)
+		if self.digest_size:
+			self.digest_block += bytes(self.digest_size)
+			
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
 	
 	@classmethod
-	def get_writer_by_name(cls, name):
+	def from_walk(cls, startdir:str=None, ptrnstr='*', excl_dir_list=None, snapshot=None):
 		"""
-		return writer node by name.
+		Build a table from walk_files(), one stat per file, or from
+		an incremental Dir_Snapshot walk when [snapshot] is given.
 		"""
+		table = cls()
+		table.extend_walk(startdir, ptrnstr, excl_dir_list, snapshot)
+		return table
 		
-		_node_list = [nd for nd in cls.node_list if nd.name == name]
-		retnode = None
-		if len(_node_list) > 0:
-			retnode = _node_list[0]
-		return retnode
-	
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
 	
-	def write_msg(self, *args):
+	def extend_walk(self, startdir:str=None, ptrnstr='*', excl_dir_list=None, snapshot=None) -> int:
 		"""
-		write msg to buffer.
+		Append the files below [startdir] to this table, so several
+		roots can share one table. Returns the number of rows added.
+		Directories already walked for an earlier root are skipped,
+		so overlapping roots add no row twice.
 		"""
-		_arg_str = ''
-		for arg in args:
-			_arg_str += str(arg)
-		
-		_cls = Message_Writer
-		
-		if self.msg_cnt >= _cls.PRN_FLUSH_LOG_THRESHOLD:
-			self.flushbuf()
-		
-		if self.prn_flag == _cls.PRN_SCREEN_AND_FILE:
-			self.msgbuf.write(_arg_str)
-			sys.stdout.write(_arg_str)
-		elif self.prn_flag == _cls.PRN_SCREEN_ONLY:
-			sys.stdout.write(_arg_str)
+		_row_cnt = len(self)
+		_startdir = str(pathlib.Path().cwd()) if startdir is None else str(startdir)
+		_nested_list = get_nested_roots(_startdir, self.walked_roots)
+		if _nested_list is None:
+			return 0
+		_excl_dir_list = list(excl_dir_list or []) + _nested_list
+		self.walked_roots.append(_startdir)
+		if snapshot is None:
+			_walk = walk_files(_startdir, ptrnstr, _excl_dir_list)
 		else:
-			self.msgbuf.write(_arg_str)
-			
-		self.msg_cnt+=1
+			_walk = snapshot.walk_files(_startdir, ptrnstr, _excl_dir_list)
+		for path, _stat in _walk:
+			self.append(path, _stat)
+		return len(self) - _row_cnt
 		
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
-			
-	def flushbuf(self):
+	
+	def take(self, indexes):
 		"""
-		write the msgbuf to file.
+		Return a new, compact table holding only rows [indexes].
+		The columns are gathered by NumPy fancy indexing when installed.
 		"""
-		with open(self.msgfilepath,'a',encoding='utf-8') as f:
-			f.write(self.msgbuf.getvalue())
-		self.msg_cnt = 0
+		table = FileTable()
+		if numpy is not None and len(self):
+			_indexes = self._np_indexes(indexes)
+			_offsets = self._np_column(self.path_offsets)
+			_path_view = memoryview(self.path_block)
+			table.path_block = bytearray().join(_path_view[start:end] for start, end\
+				in zip(_offsets[_indexes].tolist(), _offsets[_indexes + 1].tolist()))
+			table.path_offsets = FileTable._to_index_array(numpy.concatenate((\
+				numpy.zeros(1, dtype=numpy.uint64), numpy.cumsum(_offsets[_indexes + 1] - _offsets[_indexes]))))
+			for name in ('sizes', 'mtimes', 'inodes', 'devices', 'nlinks'):
+				_column = getattr(self, name)
+				setattr(table, name, array.array(_column.typecode,\
+					self._np_column(_column)[_indexes].tobytes()))
+			table.digest_flags = bytearray(numpy.frombuffer(self.digest_flags,\
+				dtype=numpy.uint8)[_indexes].tobytes())
+			if self.digest_size:
+				table.digest_size = self.digest_size
+				table.digest_block = bytearray(numpy.frombuffer(self.digest_block,\
+					dtype=numpy.uint8).reshape(-1, self.digest_size)[_indexes].tobytes())
+			return table
+			
+		for index in indexes:
+			start = self.path_offsets[index]
+			end = self.path_offsets[index + 1]
+			table.path_block += self.path_block[start:end]
+			table.path_offsets.append(len(table.path_block))
+			table.sizes.append(self.sizes[index])
+			table.mtimes.append(self.mtimes[index])
+			table.inodes.append(self.inodes[index])
+			table.devices.append(self.devices[index])
+			table.nlinks.append(self.nlinks[index])
+			table.digest_flags.append(self.digest_flags[index])
+		if self.digest_size:
+			table.digest_size = self.digest_size
+			for index in indexes:
+				start = index * self.digest_size
+				table.digest_block += self.digest_block[start:start + self.digest_size]
+		return table
 		
 	#-------------------------------------------------------------
 	# 
 	#-------------------------------------------------------------
-
-	def close_writer(self):
-		self.write_msg(f'\nmessage writer [{self.name}] closing. . .')
-		self.flushbuf()
-		self.msgbuf.close()
-		self.is_active = False
 	
-	#-------------------------------------------------------------
-	# 
-	#------------------------------------------------------------
+	def __len__(self) -> int:
+		return len(self.sizes)
 		
-	@classmethod
-	def setup(cls):
-		cls.node_list.clear()
+	def get_path(self, index) -> str:
+		_cls = FileTable
+		start = self.path_offsets[index]
+		end = self.path_offsets[index + 1]
+		return self.path_block[start:end].decode(_cls._fs_encoding, _cls._fs_errors)
+		
+	def get_paths(self, indexes=None) -> list:
+		return list(self.iter_paths(indexes))
+		
+	def iter_paths(self, indexes=None):
+		if indexes is None:
+			indexes = range(len(self))
+		for index in indexes:
+			yield self.get_path(index)
+			
+	def total_size(self, indexes=None) -> int:
+		if indexes is None:
+			return sum(self.sizes)
+		return sum(self.sizes[index] for index in indexes)
 		
 	#-------------------------------------------------------------
 	# 
-	#------------------------------------------------------------
-		
+	#-------------------------------------------------------------
+	
+	def set_digest(self, index, hexdigest):
+		digest = bytes.fromhex(hexdigest)
+		if self.digest_size == 0:
+			self.digest_size = len(digest)
+			self.digest_block = bytearray(self.digest_size * len(self))
+		elif len(digest) != self.digest_size:
+			raise ValueError(f'digest size {len(digest)} != table digest size {self.digest_size}')
+		start = index * self.digest_size
+		self.digest_block[start:start + self.digest_size] = digest
+		self.digest_flags[index] = 1
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _np_column(self, column):
+		_dtype = numpy.int64 if column.typecode == 'q' else numpy.uint64
+		return numpy.frombuffer(column, dtype=_dtype)
+		
+	def _np_indexes(self, indexes):
+		if indexes is None:
+			return numpy.arange(len(self), dtype=numpy.uint64)
+		return numpy.frombuffer(array.array('Q', indexes), dtype=numpy.uint64)
+		
+	@staticmethod
+	def _to_index_array(np_indexes):
+		return array.array('Q', np_indexes.astype(numpy.uint64).tobytes())
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def filter_size(self, min_size=0, max_size=None, indexes=None):
+		"""
+		Return the row indexes with min_size <= size [<= max_size].
+		"""
+		if numpy is not None and len(self):
+			_indexes = self._np_indexes(indexes)
+			_sizes = self._np_column(self.sizes)[_indexes]
+			_mask = _sizes >= min_size
+			if max_size is not None:
+				_mask &= _sizes <= max_size
+			return FileTable._to_index_array(_indexes[_mask])
+			
+		if indexes is None:
+			indexes = range(len(self))
+		sizes = self.sizes
+		return array.array('Q', (index for index in indexes\
+			if sizes[index] >= min_size and (max_size is None or sizes[index] <= max_size)))
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def group_by_size(self, indexes=None, min_count=2) -> dict:
+		"""
+		Group rows by size.
+		
+		returns:
+			dict, size -> array('Q') of row indexes, for groups with
+			at least [min_count] rows, ordered by first row index.
+		"""
+		if numpy is not None and len(self):
+			_indexes = self._np_indexes(indexes)
+			_sizes = self._np_column(self.sizes)[_indexes]
+			_order = numpy.argsort(_sizes, kind='stable')
+			_sorted_indexes = _indexes[_order]
+			_sorted_sizes = _sizes[_order]
+			_bounds = numpy.flatnonzero(numpy.diff(_sorted_sizes)) + 1
+			_starts = numpy.concatenate(([0], _bounds))
+			_ends = numpy.concatenate((_bounds, [len(_sorted_sizes)]))
+			_keep = (_ends - _starts) >= min_count
+			_starts = _starts[_keep]
+			_ends = _ends[_keep]
+			_group_order = numpy.argsort(_sorted_indexes[_starts], kind='stable')
+			size_groups = {}
+			for start, end in zip(_starts[_group_order], _ends[_group_order]):
+				size_groups[int(_sorted_sizes[start])] =\
+					FileTable._to_index_array(_sorted_indexes[start:end])
+			return size_groups
+			
+		if indexes is None:
+			indexes = range(len(self))
+		group_dict = {}
+		for index in indexes:
+			group_dict.setdefault(self.sizes[index], array.array('Q')).append(index)
+		return {size: rows for size, rows in group_dict.items() if len(rows) >= min_count}
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def group_by_inode(self, indexes=None, min_count=2) -> list:
+		"""
+		Group rows that are hardlinks to the same (device, inode).
+		Only rows with a link count above one are looked at.
+		
+		returns:
+			list of array('Q') row indexes, ordered by first row index.
+		"""
+		if numpy is not None and len(self):
+			_indexes = self._np_indexes(indexes)
+			_linked = _indexes[self._np_column(self.nlinks)[_indexes] > 1]
+		else:
+			if indexes is None:
+				indexes = range(len(self))
+			_linked = [index for index in indexes if self.nlinks[index] > 1]
+			
+		group_dict = {}
+		for index in _linked:
+			index = int(index)
+			group_dict.setdefault((self.devices[index], self.inodes[index]),\
+				array.array('Q')).append(index)
+		return [rows for rows in group_dict.values() if len(rows) >= min_count]
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def unique_inodes(self, indexes=None):
+		"""
+		Return row indexes with hardlink aliases dropped, keeping the
+		first row of each (device, inode).
+		"""
+		if indexes is None:
+			indexes = range(len(self))
+		_alias_set = set()
+		for rows in self.group_by_inode(indexes):
+			_alias_set.update(rows[1:])
+		return array.array('Q', [index for index in indexes if index not in _alias_set])
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def group_by_digest(self, indexes=None, min_count=2) -> list:
+		"""
+		Group hashed rows by digest. Rows without a digest are skipped.
+		
+		returns:
+			list of array('Q') row indexes, ordered by first row index.
+		"""
+		if indexes is None:
+			indexes = range(len(self))
+		group_dict = {}
+		for index in indexes:
+			if self.digest_flags[index]:
+				start = index * self.digest_size
+				_digest = bytes(self.digest_block[start:start + self.digest_size])
+				group_dict.setdefault(_digest, array.array('Q')).append(index)
+		return [rows for rows in group_dict.values() if len(rows) >= min_count]
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _get_path_bytes(self, index) -> bytes:
+		return bytes(self.path_block[self.path_offsets[index]:self.path_offsets[index + 1]])
+		
+	def sort(self, key='path', indexes=None, reverse=False):
+		"""
+		Return row indexes sorted by [key]: 'path', 'size', 'mtime',
+		'inode' or a callable taking the path. Paths compare as their
+		encoded bytes. Sorting is stable, also with [reverse].
+		"""
+		column_dict = {'size': self.sizes, 'mtime': self.mtimes, 'inode': self.inodes}
+		
+		if (key in column_dict or key == 'path') and numpy is not None and len(self):
+			_indexes = self._np_indexes(indexes)
+			if reverse:
+				_indexes = _indexes[::-1]
+			if key == 'path':
+				_values = numpy.array([self._get_path_bytes(index) for index in _indexes.tolist()],\
+					dtype=bytes)
+			else:
+				_values = self._np_column(column_dict[key])[_indexes]
+			_sorted_indexes = _indexes[numpy.argsort(_values, kind='stable')]
+			if reverse:
+				_sorted_indexes = _sorted_indexes[::-1]
+			return FileTable._to_index_array(_sorted_indexes)
+			
+		if indexes is None:
+			indexes = range(len(self))
+		if key in column_dict:
+			_key_func = column_dict[key].__getitem__
+		elif key == 'path':
+			_key_func = self._get_path_bytes
+		else:
+			_key_func = lambda index: key(self.get_path(index))
+		return array.array('Q', sorted(indexes, key=_key_func, reverse=reverse))
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+
+class Message_Writer:
+	"""
+	Output Messages to File.
+	
+	With async_flush=True the log file is kept open and messages are
+	queued in memory; a background thread appends them to the file
+	once ASYNC_FLUSH_SIZE characters are pending or every
+	ASYNC_FLUSH_INTERVAL seconds, so write_msg never waits on disk.
+	
+	With log_format='jsonl' the log holds one JSON record per line:
+	write_event() records and write_msg() text as 'msg' records.
+	When rotate_size > 0 the log is renamed to a numbered segment
+	(optionally gzipped) once it reaches that many bytes; see
+	read_log_records() to stream a rotated log back in order.
+	"""
+	
+	node_list = []
+	
+	PRN_SCREEN_AND_FILE = 1
+	PRN_SCREEN_ONLY = 2
+	PRN_FILE_ONLY = 3
+	PRN_FLUSH_LOG_THRESHOLD = 100
+	
+	ASYNC_FLUSH_SIZE = 64 * 1024
+	ASYNC_FLUSH_INTERVAL = 1.0
+	
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def __new__(cls, name, prefix, prn_flag=1, async_flush=False,\
+		log_format='text', rotate_size=0, compress_rotated=False):
+		return super().__new__(cls)
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def __init__(self, name, prefix, prn_flag=1, async_flush=False,\
+		log_format='text', rotate_size=0, compress_rotated=False):
+		
+		_cls = Message_Writer
+		
+		self.is_active = False
+		self.name = name
+		self.prn_flag = prn_flag
+		self.msg_cnt = 0
+		self.async_flush = async_flush
+		
+		self.log_format = log_format
+		self.rotate_size = rotate_size
+		self.compress_rotated = compress_rotated
+		self.log_size = 0
+		self.segment_cnt = 0
+		
+		_ext = '.jsonl' if log_format == 'jsonl' else '.log'
+		self.msgfilepath = _cls.get_output_path_with_dt(prefix, ext=_ext)
+			
+		self.msgbuf = io.StringIO()
+		
+		self.msgfile = None
+		self._pending = []
+		self._pending_size = 0
+		self._pending_lock = threading.Lock()
+		self._file_lock = threading.Lock()
+		self._flush_event = threading.Event()
+		self._flush_thread = None
+		self._is_closing = False
+			
+		if self not in _cls.node_list:
+			_cls.node_list.append(self)
+			msg = f'\nmessage writer [{self.name}] starting. . .\n'
+			with open(self.msgfilepath,'w',encoding='utf-8') as f:
+				f.write('')
+				self.write_msg(msg)
+		else:
+			raise Exception ('message writer already established')
+			
+		if self.async_flush:
+			self.msgfile = open(self.msgfilepath,'a',encoding='utf-8')
+			self._flush_thread = threading.Thread(target=self._flush_loop,\
+				name=f'msgr-{self.name}-flush', daemon=True)
+			self._flush_thread.start()
+			
+		self.is_active = True
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	@staticmethod
+	def get_output_path_with_dt(prefix='msgr', ext='.log',\
+		_timefmt='%Y%m%d_%H%m%S%f'):
+		_path = ''.join([prefix, '_', datetime.datetime.now().strftime(_timefmt), ext])
+		return _path
+	
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
 	@classmethod
-	def shutdown(cls):
-		for lg in cls.node_list:
-			if lg.is_active:
-				lg.close_writer()
+	def get_writer_by_name(cls, name):
+		"""
+		return writer node by name.
+		"""
+		
+		_node_list = [nd for nd in cls.node_list if nd.name == name]
+		retnode = None
+		if len(_node_list) > 0:
+			retnode = _node_list[0]
+		return retnode
+	
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def write_msg(self, *args):
+		"""
+		write msg to buffer.
+		"""
+		_arg_str = ''
+		for arg in args:
+			_arg_str += str(arg)
+		
+		_cls = Message_Writer
+		
+		if self.msg_cnt >= _cls.PRN_FLUSH_LOG_THRESHOLD and not self.async_flush:
+			self.flushbuf()
+		
+		_file_str = _arg_str
+		if self.log_format == 'jsonl' and self.prn_flag != _cls.PRN_SCREEN_ONLY:
+			_file_str = self._format_record('msg', {'text': _arg_str})
+		
+		if self.prn_flag == _cls.PRN_SCREEN_AND_FILE:
+			self._buffer_msg(_file_str)
+			sys.stdout.write(_arg_str)
+		elif self.prn_flag == _cls.PRN_SCREEN_ONLY:
+			sys.stdout.write(_arg_str)
+		else:
+			self._buffer_msg(_file_str)
+			
+		self.msg_cnt+=1
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def write_event(self, event, **fields):
+		"""
+		write a structured event record to the log.
+		ignored unless log_format is 'jsonl'.
+		"""
+		if self.log_format != 'jsonl':
+			return
+			
+		if self.msg_cnt >= Message_Writer.PRN_FLUSH_LOG_THRESHOLD and not self.async_flush:
+			self.flushbuf()
+		self._buffer_msg(self._format_record(event, fields))
+		self.msg_cnt+=1
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _format_record(self, event, fields) -> str:
+		_record = {'ts': time.time(), 'writer': self.name, 'event': event}
+		_record.update(fields)
+		return json.dumps(_record, default=str) + LF
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _append_to_log(self, data):
+		"""
+		append data to the log file and rotate it when it's full.
+		"""
+		if self.msgfile is not None:
+			self.msgfile.write(data)
+			self.msgfile.flush()
+		else:
+			with open(self.msgfilepath,'a',encoding='utf-8') as f:
+				f.write(data)
+				
+		self.log_size += len(data.encode('utf-8'))	# rotate_size is in bytes
+		if self.rotate_size > 0 and self.log_size >= self.rotate_size:
+			self._rotate_log()
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _rotate_log(self):
+		self.segment_cnt += 1
+		_segment_path = Message_Writer.get_segment_path(self.msgfilepath, self.segment_cnt)
+		
+		if self.msgfile is not None:
+			self.msgfile.close()
+		os.replace(self.msgfilepath, _segment_path)
+		
+		if self.compress_rotated:
+			with open(_segment_path,'rb') as f_in:
+				with gzip.open(_segment_path + '.gz','wb') as f_out:
+					shutil.copyfileobj(f_in, f_out)
+			os.remove(_segment_path)
+			
+		if self.msgfile is not None:
+			self.msgfile = open(self.msgfilepath,'a',encoding='utf-8')
+		self.log_size = 0
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	@staticmethod
+	def get_segment_path(msgfilepath, segment_num) -> str:
+		_base, _ext = os.path.splitext(msgfilepath)
+		return f'{_base}.{segment_num:04d}{_ext}'
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _buffer_msg(self, msg):
+		if not self.async_flush:
+			self.msgbuf.write(msg)
+			return
+			
+		with self._pending_lock:
+			self._pending.append(msg)
+			self._pending_size += len(msg)
+			_is_full = self._pending_size >= Message_Writer.ASYNC_FLUSH_SIZE
+		if _is_full:
+			self._flush_event.set()
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _write_pending(self):
+		with self._pending_lock:
+			_msgs = self._pending
+			self._pending = []
+			self._pending_size = 0
+		if _msgs:
+			with self._file_lock:
+				self._append_to_log(''.join(_msgs))
 				
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _flush_loop(self):
+		while not self._is_closing:
+			self._flush_event.wait(Message_Writer.ASYNC_FLUSH_INTERVAL)
+			self._flush_event.clear()
+			self._write_pending()
+		self._write_pending()
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+			
+	def flushbuf(self):
+		"""
+		write the msgbuf to file.
+		"""
+		if self.async_flush:
+			self._write_pending()
+		else:
+			self._append_to_log(self.msgbuf.getvalue())
+			self.msgbuf.seek(0)
+			self.msgbuf.truncate(0)
+		self.msg_cnt = 0
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+
+	def close_writer(self):
+		self.write_msg(f'\nmessage writer [{self.name}] closing. . .')
+		if self.async_flush:
+			self._is_closing = True
+			self._flush_event.set()
+			self._flush_thread.join()
+			self.msgfile.close()
+		else:
+			self.flushbuf()
+		self.msgbuf.close()
+		self.is_active = False
 	
+	#-------------------------------------------------------------
+	# 
+	#------------------------------------------------------------
+		
+	@classmethod
+	def setup(cls):
+		cls.node_list.clear()
+		
+	#-------------------------------------------------------------
+	# 
+	#------------------------------------------------------------
+		
+	@classmethod
+	def shutdown(cls):
+		for lg in cls.node_list:
+			if lg.is_active:
+				lg.close_writer()
+				
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def read_log_records(msgfilepath):
+	"""
+	Stream the records of a jsonl Message_Writer log, one dict at
+	a time: rotated segments (plain or .gz) in order, then the
+	current file.
+	"""
+	_segment_num = 1
+	while True:
+		_segment_path = Message_Writer.get_segment_path(msgfilepath, _segment_num)
+		if os.path.exists(_segment_path):
+			_f = open(_segment_path,'r',encoding='utf-8')
+		elif os.path.exists(_segment_path + '.gz'):
+			_f = gzip.open(_segment_path + '.gz','rt',encoding='utf-8')
+		else:
+			break
+		with _f:
+			for line in _f:
+				yield json.loads(line)
+		_segment_num += 1
+		
+	if os.path.exists(msgfilepath):
+		with open(msgfilepath,'r',encoding='utf-8') as f:
+			for line in f:
+				yield json.loads(line)
+				
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_text_from_file(path):
+	text_rows = []
+	with open(path, 'r', encoding='utf-8') as tf:
+		text_rows = tf.readlines()
+	return text_rows
+
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def select_from_list(choice_list,title='',prompt=f'{LF}:'):
+	"""
+	A text-based dialog to display a numbered list of choices.
+	User inputs number to determine choice.
+	
+	parameters:
+		choice_list - list of strings.
+		title - string, dialog title.
+		prompt - string, input prompt.
+		
+	returns:
+		the_choice - string chosen from choice_list.
+	"""
+		
+	frame_vert = chr(9475)
+	frame_horz = chr(9473)
+	topleft=chr(9487)
+	topright=chr(9491)
+	bottomleft=chr(9495)
+	bottomright=chr(9499)
+	fill_char=' '
+	frame_width = 50
+
+	_topline = topleft+''.rjust(frame_width-2,frame_horz)+topright
+	_bottomline = bottomleft+''.rjust(frame_width-2,frame_horz)+bottomright
+	
+	print(f'{title}')
+	print(f'{_topline}')
+	for choice_num, choice in enumerate(choice_list,start=1):
+		_choice_label = f' {choice_num}:{choice}'
+		_fill_size = frame_width-2-len(_choice_label)
+		_filler = ''.rjust(_fill_size,fill_char)
+		_thisline = f'{frame_vert}{_choice_label}{_filler}{frame_vert}'
+		print(f'{_thisline}')
+	print(f'{_bottomline}')
+		
+	default_choice_num = 1
+	the_choice = choice_list[default_choice_num-1]
+	while True:
+		my_choice=input(prompt)
+		_my_choice = str(my_choice).lower()
+		_my_choice_int = 0
+		if _my_choice.isnumeric():
+			_my_choice_int = int(_my_choice)
+			if (_my_choice_int > 0) and (_my_choice_int <= len(choice_list)):
+				the_choice = choice_list[_my_choice_int-1]
+				break
+			else:
+				print(f'{LF}Invalid Choice Num:{_my_choice_int}')
+				the_choice = choice_list[default_choice_num-1]
+		elif (_my_choice is None) or (_my_choice =='') or (_my_choice == 'x'):
+			the_choice = 'x'
+			break
+		else:
+			print(f'{LF}Invalid Choice:{my_choice}')
+			
+	return the_choice
+			
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def list_to_xlsx(xls_list,xls_path) -> None:
+	"""
+	Write list to excel .xlsx file
+	
+	xls_list may be any iterable of rows; rows are streamed to a
+	write-only workbook, so the sheet is never held in memory.
+	"""
+	
+	with Report_Writer(xls_path, report_format='xlsx') as rw:
+		rw.write_rows(xls_list)
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+class Report_Writer:
+	"""
+	Streaming report writer with xlsx, csv and jsonl backends.
+	
+	Rows are written one at a time, so memory use does not grow with
+	the report. The format defaults to the report_path extension.
+	
+	Example:
+	
+		with Report_Writer('report.csv', header=['a','b']) as rw:
+			rw.write_rows(row_iter)
+	"""
+	
+	FORMAT_LIST = ['xlsx','csv','jsonl']
+	
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def __init__(self, report_path, header=None, report_format=None):
+		
+		if report_format is None:
+			report_format = pathlib.Path(report_path).suffix.lstrip('.').lower()
+		if report_format not in Report_Writer.FORMAT_LIST:
+			raise ValueError(f'unknown report format: {report_format}')
+			
+		self.report_path = report_path
+		self.report_format = report_format
+		self.header = header
+		self.row_cnt = 0
+		
+		self._wb = None
+		self._ws = None
+		self._file = None
+		self._csv_writer = None
+		
+		if report_format == 'xlsx':
+			self._wb = openpyxl.Workbook(write_only=True)
+			self._ws = self._wb.create_sheet()
+		else:
+			self._file = open(report_path,'w',encoding='utf-8',newline='')
+			if report_format == 'csv':
+				self._csv_writer = csv.writer(self._file)
+				
+		if header is not None and report_format != 'jsonl':
+			self._write(header)
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _write(self, row):
+		if self.report_format == 'xlsx':
+			self._ws.append(row)
+		elif self.report_format == 'csv':
+			self._csv_writer.writerow(row)
+		else:
+			if self.header is not None:
+				_record = dict(zip(self.header, row))
+			else:
+				_record = list(row)
+			self._file.write(json.dumps(_record, default=str) + LF)
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def write_row(self, row):
+		self._write(row)
+		self.row_cnt += 1
+		
+	def write_rows(self, rows) -> int:
+		"""
+		write every row of an iterable; returns the row count.
+		"""
+		_cnt = 0
+		for row in rows:
+			self.write_row(row)
+			_cnt += 1
+		return _cnt
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def close(self):
+		if self._wb is not None:
+			self._wb.save(self.report_path)
+			self._wb = None
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+			
+	def __enter__(self):
+		return self
+		
+	def __exit__(self, exc_type, exc_value, tb):
+		self.close()
+		return False
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+'''
+def build_dir_list(startdir:str=None, ptrnstr='*.*') -> list:
+	"""
+	Return a list of files recursively, starting with
+	[startdir] directory, matching [ptrnstr] search pattern.
+	"""
+	_dir_list = []
+	_dir_disp_list = []
+	
+	if startdir is None:
+		_startdir = str(pathlib.Path().cwd())
+	else:
+		_startdir = startdir
+	
+	p = pathlib.Path(_startdir)
+	
+	glob_list = p.rglob(ptrnstr)
+	
+	for path in glob_list:
+		_path = str(path)
+		p = pathlib.Path(_path)
+		
+		if p.is_dir(): 
+			d = {}
+			d['disp_dir'] = str(p.name)
+			d['dir'] = _path
+			_dir_disp_list.append(d)
+			
+	if len(_dir_disp_list) == 0:
+		d = {}
+		p = pathlib.Path(_startdir)
+		d['disp_dir'] = '.'
+		d['dir'] = _startdir
+		_dir_disp_list.append(d)
+		
+		d = {}
+		p = pathlib.Path(_startdir).parent
+		d['disp_dir'] = '..'
+		d['dir'] = str(p)
+		_dir_disp_list.append(d)
+		
+	
+	
+	return _dir_list
+'''
+
+def build_file_list(startdir:str=None, ptrnstr='*.*') -> list:
+	"""
+	Return a list of files recursively, starting with
+	[startdir] directory, matching [ptrnstr] search pattern.
+	"""
+	_file_list = []
+	
+	for _path, _stat in walk_files(startdir, ptrnstr, follow_symlinks=True, with_stat=False):
+		_file_list.append(_path)
+	
+	return _file_list
+
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_dir_excluder(excl_dir_list=None):
+	"""
+	Return a function (name, path) -> True if the directory is in
+	[excl_dir_list]. An entry with no path separator matches a
+	directory name anywhere, other entries match the full path.
+	"""
+	_excl_path_set = set()
+	_excl_name_set = set()
+	for _dir in (excl_dir_list or []):
+		if os.sep in str(_dir) or (os.altsep and os.altsep in str(_dir)):
+			_excl_path_set.add(os.path.abspath(_dir))
+		else:
+			_excl_name_set.add(str(_dir))
+			
+	def is_excluded(name, path) -> bool:
+		if name in _excl_name_set:
+			return True
+		return bool(_excl_path_set) and os.path.abspath(path) in _excl_path_set
+		
+	return is_excluded
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_name_matcher(ptrnstr='*'):
+	"""
+	Return a compiled match function for an fnmatch pattern,
+	or None when the pattern matches every name.
+	"""
+	if ptrnstr in (None, '', '*'):
+		return None
+	return re.compile(fnmatch.translate(ptrnstr)).match
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def walk_files(startdir:str=None, ptrnstr='*', excl_dir_list=None,\
+	follow_symlinks=False, with_stat=True):
+	"""
+	Yield (path, stat_result) for each file below [startdir] whose
+	name matches [ptrnstr], walking with os.scandir.
+	
+	parameters:
+		startdir - string, top directory. Defaults to cwd.
+		ptrnstr - string, fnmatch pattern for file names.
+		excl_dir_list - list of directories to prune. An entry with
+			no path separator matches a directory name anywhere.
+		follow_symlinks - bool, include symlinks to files.
+		with_stat - bool, stat each file. When False None is yielded
+			in place of the stat_result and no stat call is made.
+			
+	Directory types come from the cached DirEntry data, symlinked
+	directories are not descended into, and excluded directories are
+	never opened. Each directory is listed in name order, so the
+	output is repeatable, and only one directory listing is held at
+	a time.
+	"""
+	if startdir is None:
+		_startdir = str(pathlib.Path().cwd())
+	else:
+		_startdir = str(startdir)
+		
+	_is_excluded = get_dir_excluder(excl_dir_list)
+	_match = get_name_matcher(ptrnstr)
+		
+	_dir_stack = [_startdir]
+	while _dir_stack:
+		_dirpath = _dir_stack.pop()
+		try:
+			with os.scandir(_dirpath) as it:
+				_entries = sorted(it, key=attrgetter('name'))
+		except OSError:
+			continue
+			
+		_subdirs = []
+		for entry in _entries:
+			try:
+				if entry.is_dir(follow_symlinks=False):
+					if _is_excluded(entry.name, entry.path):
+						continue
+					_subdirs.append(entry.path)
+				elif entry.is_file(follow_symlinks=follow_symlinks):
+					if _match is not None and _match(entry.name) is None:
+						continue
+					_stat = entry.stat(follow_symlinks=follow_symlinks) if with_stat else None
+					yield entry.path, _stat
+			except OSError:
+				continue
+				
+		_dir_stack.extend(reversed(_subdirs))
+
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def get_nested_roots(startdir, root_list):
+	"""
+	Return the roots of [root_list] that lie below [startdir], to be
+	pruned from its walk, or None when [startdir] lies at or below
+	one of them and has already been walked.
+	"""
+	_startdir = os.path.abspath(startdir)
+	_nested_list = []
+	for root in root_list:
+		_root = os.path.abspath(root)
+		try:
+			_common = os.path.commonpath([_root, _startdir])
+		except ValueError:
+			continue	# different drives
+		if _common == _root:
+			return None
+		if _common == _startdir:
+			_nested_list.append(_root)
+	return _nested_list
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+class Dir_Snapshot:
+	"""
+	SQLite snapshot of a directory tree for incremental rescans.
+	
+	Each directory is stored with its (inode, mtime_ns, entry count),
+	its subdirectory names and the stat data of its files. On the
+	next walk, a directory whose inode and mtime_ns are unchanged is
+	not listed and its files are not stat-ed; the stored entries are
+	reused. Only one stat per directory is made.
+	
+	A file rewritten in place does not change its directory's mtime,
+	so its stored stat can go stale. A full verify rescans every
+	directory; it runs when [full_verify_days] have passed since the
+	last one, or always with force_full_verify=True. It is decided
+	once per instance and covers every root walked with it; the
+	time is recorded by close().
+	"""
+	
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def __init__(self, db_path, full_verify_days=7.0, force_full_verify=False):
+		self.db_path = db_path
+		self.full_verify_days = full_verify_days
+		self.force_full_verify = force_full_verify
+		self.is_full_verify = False
+		self.walked_cnt = 0
+		self.reused_dir_cnt = 0
+		self.scanned_dir_cnt = 0
+		self.pruned_dir_cnt = 0
+		self.stat_cnt = 0
+		
+		# the walk may run on a worker thread; one thread at a time uses it
+		self.conn = sqlite3.connect(db_path, check_same_thread=False)
+		self.conn.execute('PRAGMA journal_mode=WAL')
+		self.conn.execute('PRAGMA synchronous=NORMAL')
+		self.conn.execute('CREATE TABLE IF NOT EXISTS dirs ('\
+			'path TEXT PRIMARY KEY, ino INTEGER, mtime_ns INTEGER, '\
+			'entry_cnt INTEGER, subdirs TEXT)')
+		self.conn.execute('CREATE TABLE IF NOT EXISTS files ('\
+			'dirpath TEXT, name TEXT, mode INTEGER, ino INTEGER, dev INTEGER, '\
+			'nlink INTEGER, size INTEGER, atime_ns INTEGER, mtime_ns INTEGER, '\
+			'ctime_ns INTEGER, PRIMARY KEY (dirpath, name))')
+		self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+		
+		# decided once, so every root walked with this snapshot gets the same verify
+		self.is_full_verify = self.is_full_verify_due()
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def is_full_verify_due(self) -> bool:
+		if self.force_full_verify:
+			return True
+		row = self.conn.execute("SELECT value FROM meta WHERE key='last_full_verify'").fetchone()
+		if row is None:
+			return True
+		return (time.time() - float(row[0])) >= self.full_verify_days * 86400
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	@staticmethod
+	def _row_to_stat(row):
+		mode, ino, dev, nlink, size, atime_ns, mtime_ns, ctime_ns = row
+		return os.stat_result((mode, ino, dev, nlink, 0, 0, size,\
+			atime_ns // 1000000000, mtime_ns // 1000000000, ctime_ns // 1000000000,\
+			atime_ns / 1e9, mtime_ns / 1e9, ctime_ns / 1e9,\
+			atime_ns, mtime_ns, ctime_ns))
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _get_dir(self, dirpath, dir_stat):
+		"""
+		return (subdir names, [(name, stat_result)]) for an unchanged
+		directory, or None when it must be scanned.
+		"""
+		row = self.conn.execute('SELECT ino, mtime_ns, entry_cnt, subdirs '\
+			'FROM dirs WHERE path=?', (dirpath,)).fetchone()
+		if row is None or row[0] != dir_stat.st_ino or row[1] != dir_stat.st_mtime_ns:
+			return None
+			
+		_subdir_names = json.loads(row[3])
+		_file_rows = []
+		for file_row in self.conn.execute('SELECT name, mode, ino, dev, nlink, size, '\
+			'atime_ns, mtime_ns, ctime_ns FROM files WHERE dirpath=? ORDER BY name', (dirpath,)):
+			_file_rows.append((file_row[0], Dir_Snapshot._row_to_stat(file_row[1:])))
+			
+		# a partly written snapshot entry is rescanned
+		if len(_subdir_names) + len(_file_rows) != row[2]:
+			return None
+		return _subdir_names, _file_rows
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _scan_dir(self, dirpath, dir_stat, follow_symlinks):
+		try:
+			with os.scandir(dirpath) as it:
+				_entries = sorted(it, key=attrgetter('name'))
+		except OSError:
+			return None
+			
+		_subdir_names = []
+		_file_rows = []
+		for entry in _entries:
+			try:
+				if entry.is_dir(follow_symlinks=False):
+					_subdir_names.append(entry.name)
+				elif entry.is_file(follow_symlinks=follow_symlinks):
+					_file_rows.append((entry.name, entry.stat(follow_symlinks=follow_symlinks)))
+			except OSError:
+				continue
+		self.stat_cnt += len(_file_rows)
+				
+		self.conn.execute('DELETE FROM files WHERE dirpath=?', (dirpath,))
+		self.conn.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',\
+			[(dirpath, name, st.st_mode, st.st_ino, st.st_dev, st.st_nlink, st.st_size,\
+			st.st_atime_ns, st.st_mtime_ns, st.st_ctime_ns) for name, st in _file_rows])
+		self.conn.execute('INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?)',\
+			(dirpath, dir_stat.st_ino, dir_stat.st_mtime_ns,\
+			len(_subdir_names) + len(_file_rows), json.dumps(_subdir_names)))
+		return _subdir_names, _file_rows
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def _prune_dirs(self, startdir, visited_set):
+		"""
+		drop snapshot entries below [startdir] not reached by this walk.
+		"""
+		_prefix = os.path.join(startdir, '')
+		_stale = []
+		for (path,) in self.conn.execute('SELECT path FROM dirs WHERE path >= ? AND path < ?',\
+			(_prefix, _prefix[:-1] + chr(ord(_prefix[-1]) + 1))):
+			if path not in visited_set:
+				_stale.append((path,))
+		self.conn.executemany('DELETE FROM dirs WHERE path=?', _stale)
+		self.conn.executemany('DELETE FROM files WHERE dirpath=?', _stale)
+		self.pruned_dir_cnt += len(_stale)
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def walk_files(self, startdir:str=None, ptrnstr='*', excl_dir_list=None,\
+		follow_symlinks=False):
+		"""
+		Same output as walk_files(), reusing unchanged directories
+		from the snapshot and updating the snapshot as it goes.
+		"""
+		if startdir is None:
+			_startdir = str(pathlib.Path().cwd())
+		else:
+			_startdir = str(startdir)
+			
+		_is_excluded = get_dir_excluder(excl_dir_list)
+		_match = get_name_matcher(ptrnstr)
+		
+		_visited_set = set()
+		
+		_dir_stack = [_startdir]
+		while _dir_stack:
+			_dirpath = _dir_stack.pop()
+			try:
+				_dir_stat = os.stat(_dirpath)
+			except OSError:
+				continue
+			self.stat_cnt += 1
+			_visited_set.add(_dirpath)
+			
+			_listing = None
+			if not self.is_full_verify:
+				_listing = self._get_dir(_dirpath, _dir_stat)
+			if _listing is not None:
+				self.reused_dir_cnt += 1
+			else:
+				_listing = self._scan_dir(_dirpath, _dir_stat, follow_symlinks)
+				if _listing is None:
+					continue
+				self.scanned_dir_cnt += 1
+				
+			_subdir_names, _file_rows = _listing
+			for name, _stat in _file_rows:
+				if _match is None or _match(name) is not None:
+					yield os.path.join(_dirpath, name), _stat
+					
+			_subdirs = []
+			for name in _subdir_names:
+				_subdir = os.path.join(_dirpath, name)
+				if not _is_excluded(name, _subdir):
+					_subdirs.append(_subdir)
+			_dir_stack.extend(reversed(_subdirs))
+			
+		self._prune_dirs(_startdir, _visited_set)
+		self.walked_cnt += 1
+		self.conn.commit()
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def as_str(self) -> str:
+		_msg = f'{LF}<{self.__class__.__name__}> {self.db_path} '\
+			f'full verify: {self.is_full_verify} reused dirs: {self.reused_dir_cnt} '\
+			f'scanned dirs: {self.scanned_dir_cnt} pruned dirs: {self.pruned_dir_cnt}'
+		return _msg
+		
+	def __repr__(self) -> str:
+		return self.as_str()
+		
+	def close(self):
+		if self.is_full_verify and self.walked_cnt > 0:
+			self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('last_full_verify', ?)",\
+				(str(time.time()),))
+		self.conn.commit()
+		self.conn.close()
+		
 #-------------------------------------------------------------
-# 
+# Near-duplicate text: MinHash signatures and LSH buckets.
 #-------------------------------------------------------------
+#
+# A text becomes the set of its word shingles. The MinHash of the
+# set under num_perm random hash functions gives a signature whose
+# share of equal values estimates the Jaccard similarity of two
+# sets. LSH cuts the signature into bands; texts sharing any whole
+# band become a candidate pair, so only texts likely to be similar
+# are ever compared.
+#
 
-def get_text_from_file(path):
-	text_rows = []
-	with open(path, 'r', encoding='utf-8') as tf:
-		text_rows = tf.readlines()
-	return text_rows
+MINHASH_PRIME = (1 << 61) - 1
+MINHASH_MAX = (1 << 32) - 1
+MINHASH_BATCHSIZE = 8192
+TEXT_SNIFF_SIZE = 8192
 
+def read_text_file(path, max_size):
+	"""
+	Return the bytes of a text file, or None for a binary file (a
+	NUL byte in the first TEXT_SNIFF_SIZE bytes) or one larger than
+	[max_size]. Only the head is read before a binary is turned away.
+	"""
+	with open(path, 'rb') as f:
+		data = f.read(TEXT_SNIFF_SIZE)
+		if b'\0' in data:
+			return None
+		if len(data) == TEXT_SNIFF_SIZE:
+			data += f.read(max_size + 1 - TEXT_SNIFF_SIZE)
+	if len(data) > max_size:
+		return None
+	return data
+	
+def get_text_shingles(text, shingle_size=5) -> set:
+	"""
+	Return the set of 32-bit hashes of the [shingle_size]-word
+	shingles of [text], case folded. A text shorter than one
+	shingle gives a single shingle of all its words.
+	"""
+	words = text.lower().split()
+	if len(words) <= shingle_size:
+		shingle_list = [' '.join(words)] if words else []
+	else:
+		shingle_list = [' '.join(words[index:index + shingle_size])\
+			for index in range(len(words) - shingle_size + 1)]
+	return {zlib.crc32(shingle.encode('utf-8')) for shingle in shingle_list}
+	
 #-------------------------------------------------------------
 # 
 #-------------------------------------------------------------
 
-def select_from_list(choice_list,title='',prompt=f'{LF}:'):
+@functools.lru_cache(maxsize=8)
+def get_minhash_params(num_perm, seed=1) -> tuple:
 	"""
-	A text-based dialog to display a numbered list of choices.
-	User inputs number to determine choice.
-	
-	parameters:
-		choice_list - list of strings.
-		title - string, dialog title.
-		prompt - string, input prompt.
+	(a, b) pairs of the hash functions (a * x + b) mod MINHASH_PRIME.
+	a and b stay below 2**32 so a * x + b fits 64 bits for numpy.
+	"""
+	rng = random.Random(seed)
+	return tuple((rng.randrange(1, MINHASH_MAX), rng.randrange(0, MINHASH_MAX))\
+		for _ in range(num_perm))
 		
-	returns:
-		the_choice - string chosen from choice_list.
+def get_minhash_signature(shingle_set, num_perm=128, seed=1) -> bytes:
+	"""
+	Return the MinHash of [shingle_set] as num_perm packed 32-bit
+	values, or None for an empty set.
 	"""
+	if not shingle_set:
+		return None
+	params = get_minhash_params(num_perm, seed)
+	
+	if numpy is not None:
+		_a = numpy.array([a for a, _ in params], dtype=numpy.uint64)[:, None]
+		_b = numpy.array([b for _, b in params], dtype=numpy.uint64)[:, None]
+		_shingles = numpy.fromiter(shingle_set, dtype=numpy.uint64, count=len(shingle_set))
+		_mins = numpy.full(num_perm, MINHASH_MAX, dtype=numpy.uint64)
+		for start in range(0, len(_shingles), MINHASH_BATCHSIZE):
+			_hashes = ((_shingles[start:start + MINHASH_BATCHSIZE] * _a + _b)\
+				% numpy.uint64(MINHASH_PRIME)) & numpy.uint64(MINHASH_MAX)
+			_mins = numpy.minimum(_mins, _hashes.min(axis=1))
+		return array.array('I', _mins.astype(numpy.uint32).tolist()).tobytes()
 		
-	frame_vert = chr(9475)
-	frame_horz = chr(9473)
-	topleft=chr(9487)
-	topright=chr(9491)
-	bottomleft=chr(9495)
-	bottomright=chr(9499)
-	fill_char=' '
-	frame_width = 50
-
-	_topline = topleft+''.rjust(frame_width-2,frame_horz)+topright
-	_bottomline = bottomleft+''.rjust(frame_width-2,frame_horz)+bottomright
-	
-	print(f'{title}')
-	print(f'{_topline}')
-	for choice_num, choice in enumerate(choice_list,start=1):
-		_choice_label = f' {choice_num}:{choice}'
-		_fill_size = frame_width-2-len(_choice_label)
-		_filler = ''.rjust(_fill_size,fill_char)
-		_thisline = f'{frame_vert}{_choice_label}{_filler}{frame_vert}'
-		print(f'{_thisline}')
-	print(f'{_bottomline}')
+	return array.array('I', [min(((a * x + b) % MINHASH_PRIME) & MINHASH_MAX for x in shingle_set)\
+		for a, b in params]).tobytes()
 		
-	default_choice_num = 1
-	the_choice = choice_list[default_choice_num-1]
-	while True:
-		my_choice=input(prompt)
-		_my_choice = str(my_choice).lower()
-		_my_choice_int = 0
-		if _my_choice.isnumeric():
-			_my_choice_int = int(_my_choice)
-			if (_my_choice_int > 0) and (_my_choice_int <= len(choice_list)):
-				the_choice = choice_list[_my_choice_int-1]
-				break
-			else:
-				print(f'{LF}Invalid Choice Num:{_my_choice_int}')
-				the_choice = choice_list[default_choice_num-1]
-		elif (_my_choice is None) or (_my_choice =='') or (_my_choice == 'x'):
-			the_choice = 'x'
-			break
-		else:
-			print(f'{LF}Invalid Choice:{my_choice}')
-			
-	return the_choice
-			
 #-------------------------------------------------------------
 # 
 #-------------------------------------------------------------
 
-def list_to_xlsx(xls_list,xls_path) -> None:
+def get_text_file_minhash(path, num_perm=128, shingle_size=5, max_size=8 * 1024 * 1024) -> bytes:
 	"""
-	Write list to excel .xlsx file
+	MinHash signature of a text file, or None for a binary file (a
+	NUL byte in the first TEXT_SNIFF_SIZE bytes), an empty file or
+	one larger than [max_size]. A binary file is read no further than
+	its first TEXT_SNIFF_SIZE bytes. Text is decoded as utf-8, with
+	bad bytes replaced, and dropped once hashed.
 	"""
+	data = read_text_file(path, max_size)
+	if data is None:
+		return None
+	shingle_set = get_text_shingles(data.decode('utf-8', errors='replace'), shingle_size)
+	return get_minhash_signature(shingle_set, num_perm)
 	
-	wb = openpyxl.Workbook()
-	ws = wb.active
-	
-	for row in xls_list:
-		ws.append(row)
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
 
-	wb.save(xls_path)
+def get_lsh_params(threshold, num_perm, fp_weight=0.5, fn_weight=0.5) -> tuple:
+	"""
+	Return (bands, rows) with bands * rows <= [num_perm] minimizing
+	the weighted false positive and false negative probability mass
+	around the Jaccard [threshold].
+	"""
+	steps = 100
+	def area(func, low, high):
+		width = (high - low) / steps
+		return sum(func(low + (step + 0.5) * width) for step in range(steps)) * width
 		
+	best = None
+	for bands in range(1, num_perm + 1):
+		for rows in range(1, num_perm // bands + 1):
+			false_pos = area(lambda s: 1 - (1 - s ** rows) ** bands, 0.0, threshold)
+			false_neg = area(lambda s: (1 - s ** rows) ** bands, threshold, 1.0)
+			error = fp_weight * false_pos + fn_weight * false_neg
+			if best is None or error < best[0]:
+				best = (error, bands, rows)
+	return best[1], best[2]
+	
 #-------------------------------------------------------------
 # 
 #-------------------------------------------------------------
-'''
-def build_dir_list(startdir:str=None, ptrnstr='*.*') -> list:
+
+class MinHash_Index:
 	"""
-	Return a list of files recursively, starting with
-	[startdir] directory, matching [ptrnstr] search pattern.
+	LSH index of MinHash signatures for near-duplicate texts.
+	
+	Signatures are cut into bands of rows values; each band has a
+	dict from the band bytes to the ids holding them. A bucket keeps
+	a bare id until a second id arrives. Candidate pairs come from
+	shared buckets only and are scored by the share of equal
+	signature values, the estimated Jaccard similarity.
 	"""
-	_dir_list = []
-	_dir_disp_list = []
 	
-	if startdir is None:
-		_startdir = str(pathlib.Path().cwd())
-	else:
-		_startdir = startdir
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
-	p = pathlib.Path(_startdir)
+	def __init__(self, num_perm=128, threshold=0.8):
+		self.num_perm = num_perm
+		self.threshold = threshold
+		self.bands, self.rows = get_lsh_params(threshold, num_perm)
+		self.band_dicts = [{} for _ in range(self.bands)]
+		self.path_list = []
+		self.signature_list = []
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
-	glob_list = p.rglob(ptrnstr)
+	def add(self, path, signature) -> int:
+		item_id = len(self.path_list)
+		self.path_list.append(path)
+		self.signature_list.append(signature)
+		band_size = self.rows * 4
+		for band, band_dict in enumerate(self.band_dicts):
+			key = signature[band * band_size:(band + 1) * band_size]
+			bucket = band_dict.get(key)
+			if bucket is None:
+				band_dict[key] = item_id
+			elif isinstance(bucket, int):
+				band_dict[key] = [bucket, item_id]
+			else:
+				bucket.append(item_id)
+		return item_id
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
-	for path in glob_list:
-		_path = str(path)
-		p = pathlib.Path(_path)
+	def get_similarity(self, id_a, id_b) -> float:
+		sig_a = self.signature_list[id_a]
+		sig_b = self.signature_list[id_b]
+		if numpy is not None:
+			equal_cnt = int(numpy.count_nonzero(numpy.frombuffer(sig_a, dtype=numpy.uint32)\
+				== numpy.frombuffer(sig_b, dtype=numpy.uint32)))
+		else:
+			equal_cnt = sum(1 for x, y in zip(array.array('I', sig_a), array.array('I', sig_b)) if x == y)
+		return equal_cnt / self.num_perm
 		
-		if p.is_dir(): 
-			d = {}
-			d['disp_dir'] = str(p.name)
-			d['dir'] = _path
-			_dir_disp_list.append(d)
+	def iter_candidate_pairs(self):
+		"""
+		Yield each (id_a, id_b) pair sharing a bucket once, id_a < id_b.
+		"""
+		seen_set = set()
+		for band_dict in self.band_dicts:
+			for bucket in band_dict.values():
+				if isinstance(bucket, int):
+					continue
+				for index, id_a in enumerate(bucket):
+					for id_b in bucket[index + 1:]:
+						if (id_a, id_b) not in seen_set:
+							seen_set.add((id_a, id_b))
+							yield id_a, id_b
+							
+	def iter_similar_pairs(self, threshold=None):
+		"""
+		Yield (path_a, path_b, similarity) for candidate pairs at or
+		above [threshold] (default: the index threshold).
+		"""
+		if threshold is None:
+			threshold = self.threshold
+		for id_a, id_b in self.iter_candidate_pairs():
+			similarity = self.get_similarity(id_a, id_b)
+			if similarity >= threshold:
+				yield self.path_list[id_a], self.path_list[id_b], similarity
+				
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	@staticmethod
+	def get_clusters(pair_list) -> list:
+		"""
+		Join similar pairs into groups of paths (connected pairs),
+		ordered by first appearance.
+		"""
+		parent_dict = {}
+		def find(path):
+			parent_dict.setdefault(path, path)
+			while parent_dict[path] != path:
+				parent_dict[path] = parent_dict[parent_dict[path]]
+				path = parent_dict[path]
+			return path
 			
-	if len(_dir_disp_list) == 0:
-		d = {}
-		p = pathlib.Path(_startdir)
-		d['disp_dir'] = '.'
-		d['dir'] = _startdir
-		_dir_disp_list.append(d)
+		for path_a, path_b, _ in pair_list:
+			root_a = find(path_a)
+			root_b = find(path_b)
+			if root_a != root_b:
+				parent_dict[root_b] = root_a
+				
+		group_dict = {}
+		for path in parent_dict:
+			group_dict.setdefault(find(path), []).append(path)
+		return list(group_dict.values())
 		
-		d = {}
-		p = pathlib.Path(_startdir).parent
-		d['disp_dir'] = '..'
-		d['dir'] = str(p)
-		_dir_disp_list.append(d)
+	def as_str(self) -> str:
+		_msg = f'{LF}<{self.__class__.__name__}> texts: {len(self.path_list)} '\
+			f'num_perm: {self.num_perm} bands: {self.bands} rows: {self.rows} threshold: {self.threshold}'
+		return _msg
+		
+	def __repr__(self) -> str:
+		return self.as_str()
 		
+#-------------------------------------------------------------
+# Parallel content search over mmap.
+#-------------------------------------------------------------
+
+SEARCH_MAX_LINE_LEN = 500
+SEARCH_COUNT_WINDOW = 1024 * 1024
+
+def compile_search_patterns(pattern_list, is_regex=False, ignore_case=True):
+	"""
+	Compile [pattern_list] into one bytes regex. Each pattern is a
+	named group p0, p1, ..., so a match tells which pattern hit.
+	Plain strings are escaped unless [is_regex].
+	"""
+	group_list = []
+	for index, pattern in enumerate(pattern_list):
+		_pattern = pattern.encode('utf-8')
+		if not is_regex:
+			_pattern = re.escape(_pattern)
+		group_list.append(b'(?P<p%d>' % index + _pattern + b')')
+	flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+	return re.compile(b'|'.join(group_list), flags)
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+def count_newlines(mm, start, end) -> int:
+	"""
+	Count the newlines in [mm][start:end], copying at most
+	SEARCH_COUNT_WINDOW bytes at a time.
+	"""
+	newline_cnt = 0
+	while start < end:
+		stop = min(end, start + SEARCH_COUNT_WINDOW)
+		newline_cnt += mm[start:stop].count(b'\n')
+		start = stop
+	return newline_cnt
+	
+def search_file_mmap(path, compiled, max_matches=0) -> list:
+	"""
+	Search one file through mmap with the regex [compiled] from
+	compile_search_patterns().
 	
+	The file is never read whole into a bytes object; lines are
+	counted in bounded windows and only the matching lines are
+	copied out, so nothing of the file is kept
+	once it is unmapped. Binary files (a NUL byte in the first
+	TEXT_SNIFF_SIZE bytes) and unreadable files give no matches.
+	A line is reported once, for the first pattern that hits it.
 	
-	return _dir_list
-'''
+	returns:
+		list of (line number, pattern index, line text), at most
+		[max_matches] entries when it is above zero.
+	"""
+	match_list = []
+	try:
+		with open(path, 'rb') as f:
+			if os.fstat(f.fileno()).st_size == 0:
+				return match_list
+			with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+				if mm.find(b'\0', 0, TEXT_SNIFF_SIZE) >= 0:
+					return match_list
+				line_no = 1
+				line_pos = 0
+				line_end = -1
+				for match in compiled.finditer(mm):
+					start = match.start()
+					if start <= line_end:
+						continue
+					# count newlines from the last line start up to this match
+					line_no += count_newlines(mm, line_pos, start)
+					line_pos = mm.rfind(b'\n', 0, start) + 1
+					line_end = mm.find(b'\n', start)
+					if line_end < 0:
+						line_end = len(mm)
+					line = mm[line_pos:min(line_end, line_pos + SEARCH_MAX_LINE_LEN)]
+					match_list.append((line_no, int(match.lastgroup[1:]),\
+						line.rstrip(b'\r').decode('utf-8', errors='replace')))
+					if max_matches and len(match_list) >= max_matches:
+						break
+	except (OSError, ValueError):
+		pass
+	return match_list
+	
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
 
-def build_file_list(startdir:str=None, ptrnstr='*.*') -> list:
+def search_files(file_paths, pattern_list, is_regex=False, ignore_case=True, jobs=4,\
+	backend='thread', max_matches=0):
 	"""
-	Return a list of files recursively, starting with
-	[startdir] directory, matching [ptrnstr] search pattern.
+	Search [file_paths] for any of [pattern_list] on a [backend]
+	pool of [jobs] workers, one file per task.
+	
+	Matches stream out in file order as (path, line number, pattern,
+	line text) while later files are still being searched. At most
+	4 tasks per worker are queued ahead, and a file's matches are
+	dropped once yielded.
 	"""
-	_file_list = []
+	compiled = compile_search_patterns(pattern_list, is_regex, ignore_case)
 	
-	if startdir is None:
-		_startdir = str(pathlib.Path().cwd())
+	if jobs <= 1:
+		for path in file_paths:
+			for line_no, pattern_index, line in search_file_mmap(path, compiled, max_matches):
+				yield path, line_no, pattern_list[pattern_index], line
+		return
+		
+	if backend == 'process':
+		executor_cls = concurrent.futures.ProcessPoolExecutor
 	else:
-		_startdir = startdir
+		executor_cls = concurrent.futures.ThreadPoolExecutor
+		
+	path_iter = iter(file_paths)
+	pending = collections.deque()
+	with executor_cls(max_workers=jobs) as executor:
+		for path in itertools.islice(path_iter, jobs * 4):
+			pending.append((path, executor.submit(search_file_mmap, path, compiled, max_matches)))
+		while pending:
+			path, future = pending.popleft()
+			for next_path in itertools.islice(path_iter, 1):
+				pending.append((next_path, executor.submit(search_file_mmap, next_path, compiled, max_matches)))
+			for line_no, pattern_index, line in future.result():
+				yield path, line_no, pattern_list[pattern_index], line
+				
+#-------------------------------------------------------------
+# Trigram index for repeated text searches.
+#-------------------------------------------------------------
+
+def get_trigrams(data) -> set:
+	"""
+	Return the set of case folded byte trigrams of [data] (bytes),
+	each packed into an int.
+	"""
+	data = data.lower()
+	if len(data) < 3:
+		return set()
+	if numpy is not None:
+		_codes = numpy.frombuffer(data, dtype=numpy.uint8).astype(numpy.uint32)
+		_trigrams = (_codes[:-2] << 16) | (_codes[1:-1] << 8) | _codes[2:]
+		return set(numpy.unique(_trigrams).tolist())
+	return {(data[index] << 16) | (data[index + 1] << 8) | data[index + 2]\
+		for index in range(len(data) - 2)}
+		
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+REGEX_REPEAT_RE = re.compile(r'\{(\d*)(,\d*)?\}')
+REGEX_ESCAPE_LEN = {'x': 2, 'u': 4, 'U': 8}
+
+def get_regex_escape_end(pattern, index) -> int:
+	"""
+	Return the index just past the escape starting at [pattern][index],
+	a backslash followed by a letter or digit: the xHH, uHHHH,
+	UHHHHHHHH and N{name} escapes, octal escapes, group references
+	and one letter classes such as d.
+	"""
+	char = pattern[index + 1]
+	if char in REGEX_ESCAPE_LEN:
+		return min(index + 2 + REGEX_ESCAPE_LEN[char], len(pattern))
+	if char == 'N' and pattern.startswith('{', index + 2):
+		end = pattern.find('}', index + 2)
+		return len(pattern) if end < 0 else end + 1
+	if char.isdigit():
+		end = index + 2
+		digits = '01234567'
+		if char == '0':
+			while end < len(pattern) and end < index + 4 and pattern[end] in digits:
+				end += 1
+		elif char in digits and pattern[end:end + 2].isdigit()\
+			and all(digit in digits for digit in pattern[end:end + 2]):
+			end += 2	# three digit octal escape
+		elif end < len(pattern) and pattern[end].isdigit():
+			end += 1	# two digit group reference
+		return end
+	return index + 2
+	
+def get_regex_literals(pattern):
+	"""
+	Return literal strings that every match of regex [pattern] must
+	contain, or None when no such literal can be told apart (for
+	instance with alternation). Only runs outside groups and
+	character classes count. A backslash before a letter or digit
+	(a class, a code point or a group reference) ends a run and is
+	not a literal itself; a character made optional by
+	?, *, {0} or {0,n} is dropped from its run, and one repeated by
+	+ or {n,m} ends it.
+	"""
+	literal_list = []
+	run = ''
+	depth = 0
+	index = 0
+	while index < len(pattern):
+		char = pattern[index]
+		if char == '|':
+			return None
+		if char == '\\' and index + 1 < len(pattern):
+			next_char = pattern[index + 1]
+			if next_char.isalnum():
+				# \d, \x41, back references and the like are not literals
+				index = get_regex_escape_end(pattern, index)
+				char = '.'
+			else:
+				index += 1
+				char = next_char
+				if depth == 0:
+					run += char
+				index += 1
+				continue
+		elif char == '[':
+			index += 1
+			if index < len(pattern) and pattern[index] == '^':
+				index += 1
+			if index < len(pattern) and pattern[index] == ']':
+				index += 1
+			while index < len(pattern) and pattern[index] != ']':
+				index += 2 if pattern[index] == '\\' else 1
+			index += 1
+			char = '.'	# one unknown character
+		elif char == '{':
+			match = REGEX_REPEAT_RE.match(pattern, index)
+			if match is None:
+				if depth == 0:
+					run += char	# not a repeat, a literal {
+				index += 1
+				continue
+			index = match.end()
+			if match.group(1) in ('', '0'):
+				run = run[:-1]	# zero repeats allowed
+			char = '+'
+		else:
+			index += 1
+			if char in '?*':
+				run = run[:-1]
+			if char == '(':
+				depth += 1
+			elif char == ')':
+				depth -= 1
+				
+		if char in '.^$()?*+':
+			if depth == 0 and run:
+				literal_list.append(run)
+			run = ''
+		elif depth == 0:
+			run += char
+	if run:
+		literal_list.append(run)
+	return literal_list
 	
-	p = pathlib.Path(_startdir)
+#-------------------------------------------------------------
+# 
+#-------------------------------------------------------------
+
+class Trigram_Index:
+	"""
+	On-disk trigram index of the text files below a directory.
+	
+	Each file's case folded byte trigrams are stored as postings in
+	SQLite. update() re-reads only files whose size or mtime_ns
+	changed and drops files that are gone. A query looks up the
+	trigrams of the literals it requires, intersects their posting
+	lists smallest first, and reads only the remaining candidates
+	to confirm the match.
+	
+	Binary files and files larger than [max_file_size] are listed
+	without postings, so they are not read again until they change
+	and never match.
+	"""
+	COMMIT_EVERY = 500
+	MAX_FILE_SIZE = 64 * 1024 * 1024
 	
-	glob_list = p.rglob(ptrnstr)
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
-	for path in glob_list:
-		_path = str(path)
-		p = pathlib.Path(_path)
+	def __init__(self, db_path, max_file_size=MAX_FILE_SIZE):
+		self.db_path = db_path
+		self.max_file_size = max_file_size
+		self.indexed_cnt = 0
+		self.unchanged_cnt = 0
+		self.removed_cnt = 0
+		self.candidate_cnt = 0
+		
+		self.conn = sqlite3.connect(db_path)
+		self.conn.execute('PRAGMA journal_mode=WAL')
+		self.conn.execute('PRAGMA synchronous=NORMAL')
+		self.conn.execute('CREATE TABLE IF NOT EXISTS files ('\
+			'id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, '\
+			'mtime_ns INTEGER, is_text INTEGER)')
+		self.conn.execute('CREATE TABLE IF NOT EXISTS postings ('\
+			'trigram INTEGER, file_id INTEGER, PRIMARY KEY (trigram, file_id)) WITHOUT ROWID')
+		self.conn.execute('CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id)')
 		
-		if p.is_file(): 
-			_file_list.append(_path)
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
 	
-	return _file_list
-
+	def _index_file(self, path, stat_result, file_id=None):
+		data = None
+		if stat_result.st_size <= self.max_file_size:
+			try:
+				data = read_text_file(path, self.max_file_size)
+			except OSError:
+				return
+		is_text = data is not None
+		
+		if file_id is None:
+			file_id = self.conn.execute('INSERT INTO files (path, size, mtime_ns, is_text) '\
+				'VALUES (?, ?, ?, ?)', (path, stat_result.st_size, stat_result.st_mtime_ns,\
+				int(is_text))).lastrowid
+		else:
+			self.conn.execute('DELETE FROM postings WHERE file_id=?', (file_id,))
+			self.conn.execute('UPDATE files SET size=?, mtime_ns=?, is_text=? WHERE id=?',\
+				(stat_result.st_size, stat_result.st_mtime_ns, int(is_text), file_id))
+		if is_text:
+			self.conn.executemany('INSERT INTO postings VALUES (?, ?)',\
+				((trigram, file_id) for trigram in get_trigrams(data)))
+		self.indexed_cnt += 1
+		
+	def update(self, startdir:str=None, ptrnstr='*', excl_dir_list=None):
+		"""
+		Bring the index in line with the files below [startdir].
+		"""
+		if startdir is None:
+			startdir = str(pathlib.Path().cwd())
+		startdir = str(startdir)
+		_prefix = os.path.join(startdir, '')
+		
+		known_dict = {}
+		for file_id, path, size, mtime_ns in self.conn.execute('SELECT id, path, size, mtime_ns '\
+			'FROM files WHERE path >= ? AND path < ?', (_prefix, _prefix[:-1] + chr(ord(_prefix[-1]) + 1))):
+			known_dict[path] = (file_id, size, mtime_ns)
+			
+		pending_cnt = 0
+		for path, _stat in walk_files(startdir, ptrnstr, excl_dir_list):
+			known = known_dict.pop(path, None)
+			if known is not None and known[1:] == (_stat.st_size, _stat.st_mtime_ns):
+				self.unchanged_cnt += 1
+				continue
+			self._index_file(path, _stat, None if known is None else known[0])
+			pending_cnt += 1
+			if pending_cnt >= Trigram_Index.COMMIT_EVERY:
+				self.conn.commit()
+				pending_cnt = 0
+				
+		# files left in known_dict are gone or no longer match
+		for file_id, _, _ in known_dict.values():
+			self.conn.execute('DELETE FROM postings WHERE file_id=?', (file_id,))
+			self.conn.execute('DELETE FROM files WHERE id=?', (file_id,))
+		self.removed_cnt += len(known_dict)
+		self.conn.commit()
+		
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def get_candidates(self, literal_list, startdir:str=None) -> list:
+		"""
+		Return the indexed text file paths holding all trigrams of
+		[literal_list], below [startdir] when given.
+		"""
+		trigram_set = set()
+		for literal in literal_list or []:
+			trigram_set.update(get_trigrams(literal.encode('utf-8')))
+			
+		if not trigram_set:
+			file_id_set = None
+		else:
+			posting_list = []
+			for trigram in trigram_set:
+				posting_list.append([row[0] for row in self.conn.execute(\
+					'SELECT file_id FROM postings WHERE trigram=?', (trigram,))])
+			posting_list.sort(key=len)
+			file_id_set = set(posting_list[0])
+			for posting in posting_list[1:]:
+				if not file_id_set:
+					break
+				file_id_set.intersection_update(posting)
+				
+		_sql = 'SELECT id, path FROM files WHERE is_text=1'
+		_params = ()
+		if startdir is not None:
+			_prefix = os.path.join(str(startdir), '')
+			_sql += ' AND path >= ? AND path < ?'
+			_params = (_prefix, _prefix[:-1] + chr(ord(_prefix[-1]) + 1))
+		candidate_list = []
+		for file_id, path in self.conn.execute(_sql + ' ORDER BY path', _params):
+			if file_id_set is None or file_id in file_id_set:
+				candidate_list.append(path)
+		self.candidate_cnt += len(candidate_list)
+		return candidate_list
+		
+	def search(self, query, is_regex=False, ignore_case=True, startdir:str=None, jobs=1):
+		"""
+		Yield the paths of indexed text files matching [query], a
+		substring or, with [is_regex], a regular expression. Only
+		candidate files are searched, through search_files(), and
+		their text is not kept.
+		"""
+		literal_list = get_regex_literals(query) if is_regex else [query]
+		if ignore_case and literal_list:
+			# the index folds ASCII only, so other characters can't be looked up
+			literal_list = [part for literal in literal_list\
+				for part in re.split(r'[^\x00-\x7f]+', literal)]
+				
+		for path, _, _, _ in search_files(self.get_candidates(literal_list, startdir), [query],\
+			is_regex, ignore_case, jobs, max_matches=1):
+			yield path
+			
+	#-------------------------------------------------------------
+	# 
+	#-------------------------------------------------------------
+	
+	def as_str(self) -> str:
+		file_cnt = self.conn.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+		_msg = f'{LF}<{self.__class__.__name__}> {self.db_path} files: {file_cnt} '\
+			f'indexed: {self.indexed_cnt} unchanged: {self.unchanged_cnt} '\
+			f'removed: {self.removed_cnt} candidates read: {self.candidate_cnt}'
+		return _msg
+		
+	def __repr__(self) -> str:
+		return self.as_str()
+		
+	def close(self):
+		self.conn.commit()
+		self.conn.close()
+		
 #-------------------------------------------------------------
 # 
 #-------------------------------------------------------------
@@ -616,35 +2758,33 @@ def main(msgr):
 	
 	msgr.write_msg(f'{LF} curdir: {curdir} {LF}')
 	
-	file_list = build_file_list(curdir, '*.py')
-	
-	for filepath in file_list:
-		fn = clsFileNode(filepath)
-		fn.sortkey = str(fn.filename).lower()
-	
-	msgr.write_msg(f'{LF} {len(file_list)} [.py] files in {curdir} dir tree. {LF}')
+	# the trigram index persists next to the log; only changed files are re-read
+	index_path = str(pathlib.Path(msgr.msgfilepath).parent.joinpath(\
+		pathlib.Path(__file__).stem + '_trigram.sqlite3'))
+	text_index = Trigram_Index(index_path)
+	text_index.update(curdir, '*.py')
 	
-	clsFileNode.sort_nodes()
+	msgr.write_msg(f'{LF} {text_index.as_str()} {LF}')
 	
-	for fn in clsFileNode.sorted_filenode_list:
-		_matches_found = False
-		#_valid_file_type = False
-		_match_strs = ['__new__']
-		_source_str = ''
-		_parentdir = str(fn.parentdir).lower()
+	_match_strs = ['__new__']
+	_candidate_set = set()
+	for s in _match_strs:
+		_candidate_set.update(text_index.get_candidates([s], startdir=curdir))
+		
+	_candidate_list = []
+	for _path in sorted(_candidate_set, key=lambda path: os.path.basename(path).lower()):
+		_parentdir = os.path.dirname(_path).lower()
 		_is_save_file = (('archive' in _parentdir) or ('save' in _parentdir))
-		if _is_save_file:
-			continue
+		if not _is_save_file:
+			_candidate_list.append(_path)
+			
+	# candidates are searched through mmap on a worker pool, matches stream in file order
+	for _path, _line_no, _match_str, _line in search_files(_candidate_list, _match_strs,\
+		jobs=min(8, os.cpu_count() or 1)):
+		msgr.write_msg(f'{LF} path: {_path}:{_line_no} match: {_match_str} {LF}   {_line.strip()}')
 		
-		if str(fn.filetype).startswith('text'):
-			fn.set_text_content()
-			_source_str = str(fn.text_content).lower()
-			for s in _match_strs:
-				if s in _source_str:
-					_matches_found = True
-				
-		if _matches_found:
-			msgr.write_msg(f'{LF} {LF} path: {fn.path} match_found: {_matches_found}')
+	msgr.write_msg(f'{LF} {text_index.as_str()}')
+	text_index.close()
 	
 	#-------------------------------------------------------------
 	# 
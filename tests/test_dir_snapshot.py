@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sparkwarden_lib import Dir_Snapshot
+from sparkwarden_lib import FileTable
+
+
+def test_full_verify_covers_every_root(tmp_path):
+	for root in ('r1', 'r2'):
+		os.makedirs(tmp_path / root / 'sub')
+		(tmp_path / root / 'sub' / 'f.txt').write_text('x')
+	root_list = [str(tmp_path / 'r1'), str(tmp_path / 'r2')]
+	db_path = str(tmp_path / 'snapshot.sqlite3')
+	
+	snapshot = Dir_Snapshot(db_path)
+	assert snapshot.is_full_verify
+	snapshot.close()
+	
+	# the full verify is due again; both roots must be rescanned
+	snapshot = Dir_Snapshot(db_path, full_verify_days=1)
+	snapshot.conn.execute("UPDATE meta SET value=? WHERE key='last_full_verify'",\
+		(str(time.time() - 2 * 86400),))
+	snapshot.conn.commit()
+	snapshot.close()
+	snapshot = Dir_Snapshot(db_path, full_verify_days=1)
+	file_table = FileTable()
+	for root in root_list:
+		file_table.extend_walk(root, snapshot=snapshot)
+	assert snapshot.is_full_verify
+	assert snapshot.reused_dir_cnt == 0
+	assert snapshot.scanned_dir_cnt == 4
+	snapshot.close()
+	
+	snapshot = Dir_Snapshot(db_path, full_verify_days=1)
+	assert not snapshot.is_full_verify
+	file_table = FileTable()
+	for root in root_list:
+		file_table.extend_walk(root, snapshot=snapshot)
+	assert snapshot.reused_dir_cnt == 4
+	snapshot.close()
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sparkwarden_lib
+from sparkwarden_lib import FileTable
+
+numpy = pytest.importorskip('numpy')
+
+
+def make_table(tmp_path):
+	for n, (name, data) in enumerate([('b.txt', b'xx'), ('a.txt', b'xxxx'), ('c/é.txt', b'xx'),\
+		('c/d.txt', b''), ('A.txt', b'xxxx'), ('e.txt', b'x')]):
+		path = tmp_path / name
+		path.parent.mkdir(exist_ok=True)
+		path.write_bytes(data)
+		os.utime(path, ns=(n, 1000 - n % 3))
+	file_table = FileTable.from_walk(str(tmp_path))
+	for row in range(0, len(file_table), 2):
+		file_table.set_digest(row, f'{row:032x}')
+	return file_table
+	
+def as_rows(file_table):
+	return [(path, file_table.sizes[row], file_table.mtimes[row], file_table.inodes[row],\
+		file_table.devices[row], file_table.nlinks[row], file_table.digest_flags[row],\
+		bytes(file_table.digest_block[row * 16:row * 16 + 16]))\
+		for row, path in enumerate(file_table.get_paths())]
+		
+@pytest.mark.parametrize('key', ['path', 'size', 'mtime', 'inode'])
+@pytest.mark.parametrize('reverse', [False, True])
+@pytest.mark.parametrize('indexes', [None, [5, 1, 3, 0]])
+def test_sort_numpy_matches_fallback(tmp_path, monkeypatch, key, reverse, indexes):
+	file_table = make_table(tmp_path)
+	numpy_rows = file_table.sort(key, indexes, reverse)
+	monkeypatch.setattr(sparkwarden_lib, 'numpy', None)
+	assert numpy_rows == file_table.sort(key, indexes, reverse)
+	
+def test_sort_by_path(tmp_path):
+	file_table = make_table(tmp_path)
+	paths = file_table.get_paths(file_table.sort('path'))
+	assert paths == sorted(paths, key=os.fsencode)
+	
+def test_take_numpy_matches_fallback(tmp_path, monkeypatch):
+	file_table = make_table(tmp_path)
+	indexes = file_table.sort('size', reverse=True)[:4]
+	numpy_table = file_table.take(indexes)
+	monkeypatch.setattr(sparkwarden_lib, 'numpy', None)
+	assert as_rows(numpy_table) == as_rows(file_table.take(indexes))
+	assert numpy_table.get_paths() == file_table.get_paths(indexes)
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from find_duplicate_files import get_scan_roots
+from find_duplicate_files import find_duplicate_files
+from find_duplicate_files import find_duplicate_files_pipelined
+from sparkwarden_lib import FileTable
+
+
+def make_tree(tmp_path):
+	for dirpath in ('a/c', 'a-b'):
+		os.makedirs(tmp_path / dirpath)
+	(tmp_path / 'a/c/f.txt').write_text('same')
+	(tmp_path / 'a-b/g.txt').write_text('other')
+	return [str(tmp_path / 'a'), str(tmp_path / 'a-b'), str(tmp_path / 'a/c')]
+	
+def test_get_scan_roots_nested_with_sibling(tmp_path):
+	root_list = make_tree(tmp_path)
+	_root_list = [os.path.realpath(root) for root in root_list]
+	assert get_scan_roots(root_list) == [_root_list[0], _root_list[1]]
+	
+def test_extend_walk_overlapping_roots(tmp_path):
+	root_list = make_tree(tmp_path)
+	file_table = FileTable()
+	for root in root_list:
+		file_table.extend_walk(root)
+	file_table.extend_walk(str(tmp_path))
+	assert sorted(file_table.get_paths(range(len(file_table)))) ==\
+		sorted([str(tmp_path / 'a/c/f.txt'), str(tmp_path / 'a-b/g.txt')])
+	assert find_duplicate_files(file_table) == []
+	
+def test_pipeline_overlapping_roots(tmp_path):
+	root_list = make_tree(tmp_path)
+	file_table, file_groups = find_duplicate_files_pipelined(root_list[::-1])
+	assert len(file_table) == 2
+	assert file_groups == []
@@ -0,0 +1,54 @@
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sparkwarden_lib import get_regex_literals
+from sparkwarden_lib import Trigram_Index
+
+
+@pytest.mark.parametrize('pattern, literal_list', [
+	(r'\x41BCD', ['BCD']),
+	(r'\101BCD', ['BCD']),
+	('ABCD', ['ABCD']),
+	(r'\U00000041BCD', ['BCD']),
+	(r'\N{LATIN CAPITAL LETTER A}BCD', ['BCD']),
+	(r'\0BCD', ['BCD']),
+	(r'(A)\1BCD', ['BCD']),
+	('ABC{0}D', ['AB', 'D']),
+	('ABC{0,3}D', ['AB', 'D']),
+	('ABC{,3}D', ['AB', 'D']),
+	('ABC{2}D', ['ABC', 'D']),
+	('ABC?D', ['AB', 'D']),
+	('ABC*D', ['AB', 'D']),
+	('ABC+D', ['ABC', 'D']),
+	(r'foo\d+bar', ['foo', 'bar']),
+	(r'\.com', ['.com']),
+	('a{b', ['a{b']),
+	('ab|cd', None),
+])
+def test_get_regex_literals(pattern, literal_list):
+	assert get_regex_literals(pattern) == literal_list
+	
+@pytest.mark.parametrize('pattern', [r'\x41BCD', r'\101BCD', 'ABCX{0}D', 'AB{1,2}CD'])
+def test_search_finds_regex_matches(tmp_path, pattern):
+	(tmp_path / 'docs').mkdir()
+	(tmp_path / 'docs' / 'a.txt').write_text('xx ABCD yy\n')
+	(tmp_path / 'docs' / 'b.txt').write_text('nothing here\n')
+	assert re.search(pattern, 'xx ABCD yy')
+	index = Trigram_Index(str(tmp_path / 'index.sqlite3'))
+	index.update(str(tmp_path / 'docs'))
+	assert list(index.search(pattern, is_regex=True, ignore_case=False)) ==\
+		[str(tmp_path / 'docs' / 'a.txt')]
+	
+def test_update_skips_binary_and_large_files(tmp_path):
+	(tmp_path / 'docs').mkdir()
+	(tmp_path / 'docs' / 'small.txt').write_text('needle\n')
+	(tmp_path / 'docs' / 'large.txt').write_text('needle\n' * 100)
+	(tmp_path / 'docs' / 'data.bin').write_bytes(b'\0needle\n')
+	index = Trigram_Index(str(tmp_path / 'index.sqlite3'), max_file_size=100)
+	index.update(str(tmp_path / 'docs'))
+	assert list(index.search('needle')) == [str(tmp_path / 'docs' / 'small.txt')]
@@ -0,0 +1,43 @@
+import os
+import sys
+import errno
+import builtins
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import find_duplicate_files
+from find_duplicate_files import verify_duplicate_group
+
+
+def make_files(tmp_path, count):
+	path_list = []
+	for n in range(count):
+		path = tmp_path / f'f{n}.bin'
+		path.write_bytes(b'same content')
+		path_list.append(str(path))
+	return path_list
+	
+def test_verify_retries_when_out_of_fds(tmp_path, monkeypatch):
+	path_list = make_files(tmp_path, 40)
+	open_set = set()
+	_open = builtins.open
+	
+	def limited_open(path, *args, **kwargs):
+		if len(open_set) >= 12:
+			raise OSError(errno.EMFILE, 'Too many open files')
+		f = _open(path, *args, **kwargs)
+		open_set.add(f)
+		_close = f.close
+		def close():
+			open_set.discard(f)
+			_close()
+		f.close = close
+		return f
+		
+	monkeypatch.setattr(find_duplicate_files, 'open', limited_open, raising=False)
+	assert verify_duplicate_group(path_list, max_open_files=64) == [path_list]
+	
+def test_verify_skips_vanished_files(tmp_path):
+	path_list = make_files(tmp_path, 3)
+	os.remove(path_list[1])
+	assert verify_duplicate_group(path_list) == [[path_list[0], path_list[2]]]